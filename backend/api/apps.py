@@ -5,3 +5,7 @@ class ApiConfig(AppConfig):
     """Настройки приложения Api."""
     name = 'api'
     verbose_name = 'Управление API'
+
+    def ready(self):
+        import api.checks  # noqa: F401
+        import api.signals  # noqa: F401
@@ -0,0 +1,95 @@
+import pickle
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_CACHE_KEY = 'auth-token:{key}'
+
+
+class TokenCache:
+    """
+    Кэш пар (пользователь, токен) по ключу токена. Если включен
+    TOKEN_CACHE_SHARED, пары хранятся только в общем кэше Django
+    с временем жизни TOKEN_CACHE_TIMEOUT: выход или смена пароля
+    в одном процессе сразу действуют во всех. Иначе используется
+    LRU на TOKEN_CACHE_SIZE записей в памяти процесса с временем
+    жизни TOKEN_CACHE_LOCAL_TIMEOUT.
+    Записи хранятся в pickle, чтобы запросы не делили один объект.
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        """Возвращает пару из кэша или None."""
+        if settings.TOKEN_CACHE_SHARED:
+            data = cache.get(TOKEN_CACHE_KEY.format(key=key))
+            return None if data is None else pickle.loads(data)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                return pickle.loads(entry[1])
+            self.entries.pop(key, None)
+        return None
+
+    def set(self, key, value):
+        """Сохраняет пару в кэш."""
+        data = pickle.dumps(value)
+        if settings.TOKEN_CACHE_SHARED:
+            cache.set(
+                TOKEN_CACHE_KEY.format(key=key), data,
+                settings.TOKEN_CACHE_TIMEOUT,
+            )
+        else:
+            self.store_local(key, data)
+
+    def store_local(self, key, data):
+        """Кладет запись в LRU, вытесняя самые старые."""
+        with self.lock:
+            self.entries[key] = (
+                time.monotonic() + settings.TOKEN_CACHE_LOCAL_TIMEOUT, data
+            )
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.TOKEN_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys):
+        """Удаляет токены из кэша процесса и из общего кэша."""
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+        if settings.TOKEN_CACHE_SHARED and keys:
+            cache.delete_many(
+                [TOKEN_CACHE_KEY.format(key=key) for key in keys]
+            )
+
+    def clear(self):
+        """Очищает кэш процесса."""
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication, который берет пользователя из кэша токенов
+    и обращается к базе только при промахе. Кэш сбрасывается
+    сигналами при удалении токена (выход) и изменении пользователя:
+    смене пароля, роли, деактивации.
+    """
+
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(key, credentials)
+        return credentials
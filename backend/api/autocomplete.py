@@ -0,0 +1,85 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+
+from django.conf import settings
+
+from .cache import get_version
+from recipes.models import Ingredient
+
+_index = None
+_lock = Lock()
+
+
+class IngredientIndex:
+    """
+    Отсортированный по названию справочник ингредиентов в памяти.
+    Ингредиенты с общим началом названия лежат в нем подряд,
+    поэтому поиск по началу названия - это двоичный поиск
+    и чтение подряд идущих элементов. Для поиска по вхождению
+    хранятся номера названий по каждой тройке символов.
+    """
+    def __init__(self, ingredients, version):
+        self.items = sorted(
+            (name.lower(), id) for id, name in ingredients
+        )
+        self.keys = [item[0] for item in self.items]
+        self.trigrams = defaultdict(list)
+        for position, key in enumerate(self.keys):
+            for trigram in {key[i:i + 3] for i in range(len(key) - 2)}:
+                self.trigrams[trigram].append(position)
+        self.version = version
+        self.built_at = time.monotonic()
+
+    def is_stale(self, version):
+        """Проверяет, изменился ли справочник после построения индекса."""
+        return (
+            self.version != version
+            or time.monotonic() - self.built_at
+            > settings.INGREDIENT_INDEX_TIMEOUT
+        )
+
+    def search(self, query, limit):
+        """
+        Возвращает id до limit ингредиентов: сначала тех, чье название
+        начинается с query, затем, для запросов не короче
+        INGREDIENT_SUBSTRING_MIN_LENGTH, тех, где query встречается
+        внутри. Кандидаты на вхождение берутся из самого короткого
+        списка троек символов запроса.
+        """
+        query = query.lower()
+        results = []
+        for key, id in self.items[bisect_left(self.keys, query):]:
+            if len(results) == limit or not key.startswith(query):
+                break
+            results.append(id)
+        if len(query) < max(settings.INGREDIENT_SUBSTRING_MIN_LENGTH, 3):
+            return results
+        candidates = min(
+            (
+                self.trigrams.get(query[i:i + 3], ())
+                for i in range(len(query) - 2)
+            ),
+            key=len
+        )
+        for position in candidates:
+            if len(results) == limit:
+                break
+            key, id = self.items[position]
+            if query in key and not key.startswith(query):
+                results.append(id)
+        return results
+
+
+def get_ingredient_index():
+    """Возвращает индекс ингредиентов, перестраивая его при изменениях."""
+    global _index
+    version = get_version('ingredients')
+    with _lock:
+        if _index is None or _index.is_stale(version):
+            _index = IngredientIndex(
+                Ingredient.objects.values_list('id', 'name').iterator(),
+                version
+            )
+        return _index
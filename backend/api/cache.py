@@ -0,0 +1,101 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.models import Tag
+from users.models import Follow
+
+FOLLOWING_CACHE_KEY = 'following:{user_id}'
+VERSION_CACHE_KEY = 'version:{name}'
+CACHE_STATS_KEY = 'cache-stats:{name}:{result}'
+TAG_BITS_CACHE_KEY = 'tag-bits:{version}'
+
+
+def get_following_ids(request):
+    """
+    Возвращает множество id авторов, на которых подписан пользователь.
+    Множество загружается один раз за запрос и, если задан
+    FOLLOWING_CACHE_TIMEOUT, сохраняется в кэше между запросами.
+    """
+    following_ids = getattr(request, '_following_ids', None)
+    if following_ids is not None:
+        return following_ids
+    key = FOLLOWING_CACHE_KEY.format(user_id=request.user.id)
+    if settings.FOLLOWING_CACHE_TIMEOUT:
+        following_ids = cache.get(key)
+    if following_ids is None:
+        following_ids = frozenset(Follow.objects.filter(
+            user=request.user
+        ).values_list('author_id', flat=True))
+        if settings.FOLLOWING_CACHE_TIMEOUT:
+            cache.set(key, following_ids, settings.FOLLOWING_CACHE_TIMEOUT)
+    request._following_ids = following_ids
+    return following_ids
+
+
+def invalidate_following_ids(user_id):
+    """Сбрасывает кэш подписок пользователя после подписки/отписки."""
+    cache.delete(FOLLOWING_CACHE_KEY.format(user_id=user_id))
+
+
+def get_version(name):
+    """
+    Возвращает версию набора данных name - время его последнего
+    изменения в наносекундах. По версии сбрасываются построенные
+    из набора кэши.
+    """
+    return cache.get_or_set(
+        VERSION_CACHE_KEY.format(name=name), time.time_ns, None
+    )
+
+
+def bump_version(name):
+    """Отмечает, что набор данных name изменился."""
+    cache.set(VERSION_CACHE_KEY.format(name=name), time.time_ns(), None)
+
+
+def get_tag_bits():
+    """
+    Возвращает словарь {slug: бит} тегов. Словарь хранится в кэше
+    до следующего изменения тегов.
+    """
+    return cache.get_or_set(
+        TAG_BITS_CACHE_KEY.format(version=get_version('tags')),
+        lambda: dict(Tag.objects.exclude(bit=None).values_list('slug', 'bit')),
+        settings.RESPONSE_CACHE_TIMEOUT,
+    )
+
+
+def increment(key, delta=1):
+    """Увеличивает счетчик в кэше, создавая его при необходимости."""
+    if not cache.add(key, delta, None):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            cache.set(key, delta, None)
+
+
+def record_cache_result(name, hit):
+    """Считает попадания и промахи кэша ответов для набора данных name."""
+    increment(
+        CACHE_STATS_KEY.format(name=name, result='hits' if hit else 'misses')
+    )
+
+
+def get_cache_stats(name):
+    """Возвращает число попаданий и промахов кэша ответов."""
+    return {
+        result: cache.get(
+            CACHE_STATS_KEY.format(name=name, result=result), 0
+        )
+        for result in ('hits', 'misses')
+    }
+
+
+def reset_cache_stats(name):
+    """Обнуляет счетчики кэша ответов."""
+    cache.delete_many([
+        CACHE_STATS_KEY.format(name=name, result=result)
+        for result in ('hits', 'misses')
+    ])
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    """
+    Кэш в памяти процесса не годится для нескольких воркеров:
+    версии данных, меняемые в одном воркере, не видны остальным,
+    и они отдают устаревшие ответы и ETag.
+    """
+    if settings.CACHE_BACKEND == 'locmem' and settings.WEB_CONCURRENCY > 1:
+        return [Error(
+            'CACHE_BACKEND=locmem нельзя использовать '
+            'с несколькими воркерами',
+            hint='Задайте CACHE_BACKEND=redis и CACHE_LOCATION '
+                 'или WEB_CONCURRENCY=1.',
+            id='api.E001',
+        )]
+    return []
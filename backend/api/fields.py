@@ -0,0 +1,104 @@
+import base64
+import binascii
+import re
+import uuid
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
+from rest_framework.fields import SkipField
+from rest_framework.serializers import ImageField, ValidationError
+
+DATA_URI_PATTERN = re.compile(r'data:image/(?P<type>[a-z]+);base64,')
+DECODE_CHUNK_SIZE = 64 * 1024
+IMAGE_EXTENSIONS = {'jpeg': 'jpg', 'jpg': 'jpg', 'png': 'png', 'gif': 'gif',
+                    'webp': 'webp'}
+
+
+def detect_image_type(head):
+    """Определяет формат картинки по первым байтам файла."""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+class StreamingImageField(ImageField):
+    """
+    Картинка из base64 data URI или из multipart/form-data.
+    base64 декодируется частями во временный файл, который
+    переходит из памяти на диск после RECIPE_IMAGE_SPOOL_SIZE байт.
+    Слишком большие данные и данные не-картинок отклоняются
+    до декодирования всей строки. Ссылка на уже загруженное фото
+    (http...) пропускается, как в Base64ImageField.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith('http'):
+            raise SkipField()
+        if isinstance(data, str):
+            data = self.decode(data)
+        elif isinstance(data, UploadedFile):
+            self.check_size(data.size)
+            data.seek(0)
+            if detect_image_type(data.read(16)) is None:
+                raise ValidationError(settings.IMAGE_INVALID_ERROR)
+        else:
+            raise ValidationError(settings.IMAGE_INVALID_ERROR)
+        self.verify(data)
+        return data
+
+    @staticmethod
+    def check_size(size):
+        """Отклоняет картинки больше RECIPE_IMAGE_MAX_UPLOAD_SIZE."""
+        if size > settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE:
+            raise ValidationError(settings.IMAGE_TOO_LARGE_ERROR)
+
+    def decode(self, data):
+        """Декодирует data URI частями во временный файл."""
+        match = DATA_URI_PATTERN.match(data)
+        if match is None or match['type'] not in IMAGE_EXTENSIONS:
+            raise ValidationError(settings.IMAGE_INVALID_ERROR)
+        start = match.end()
+        self.check_size((len(data) - start) * 3 // 4)
+        spooled = SpooledTemporaryFile(
+            max_size=settings.RECIPE_IMAGE_SPOOL_SIZE
+        )
+        extension = None
+        try:
+            for position in range(start, len(data), DECODE_CHUNK_SIZE):
+                chunk = base64.b64decode(
+                    data[position:position + DECODE_CHUNK_SIZE],
+                    validate=True,
+                )
+                if extension is None:
+                    extension = detect_image_type(chunk)
+                    if extension is None:
+                        raise ValidationError(settings.IMAGE_INVALID_ERROR)
+                spooled.write(chunk)
+        except (binascii.Error, ValidationError):
+            spooled.close()
+            raise ValidationError(settings.IMAGE_INVALID_ERROR)
+        if extension is None:
+            raise ValidationError(settings.IMAGE_INVALID_ERROR)
+        image = File(spooled, name=f'{uuid.uuid4()}.{extension}')
+        image.size = spooled.tell()
+        return image
+
+    @staticmethod
+    def verify(data):
+        """Проверяет, что Pillow может прочитать картинку."""
+        data.seek(0)
+        try:
+            with Image.open(data) as image:
+                image.verify()
+        except Exception:
+            raise ValidationError(settings.IMAGE_INVALID_ERROR)
+        data.seek(0)
@@ -1,34 +1,105 @@
+from django.conf import settings
+from django.db.models import Case, When
 from django_filters.rest_framework import FilterSet
-from django_filters.rest_framework.filters import (AllValuesMultipleFilter,
-                                                   BooleanFilter)
+from django_filters.rest_framework.filters import (BooleanFilter, CharFilter,
+                                                   ChoiceFilter,
+                                                   MultipleChoiceFilter)
 from rest_framework.filters import SearchFilter
 
+from .autocomplete import get_ingredient_index
+from .cache import get_tag_bits
 from recipes.models import Recipe
 
 
 class IngredientSearchFilter(SearchFilter):
-    """Фильтр поиска по имени."""
+    """
+    Фильтр поиска по имени. Подсказывает ингредиенты по началу
+    названия, а затем по вхождению, не более INGREDIENT_SEARCH_LIMIT.
+    Id подсказок берутся из индекса в памяти, а результат остается
+    QuerySet в порядке индекса.
+    """
     search_param = 'name'
 
+    def filter_queryset(self, request, queryset, view):
+        name = request.query_params.get(self.search_param)
+        if not name or view.action != 'list':
+            return super().filter_queryset(request, queryset, view)
+        if settings.INGREDIENT_AUTOCOMPLETE:
+            ids = get_ingredient_index().search(
+                name, settings.INGREDIENT_SEARCH_LIMIT
+            )
+            return queryset.filter(pk__in=ids).order_by(Case(
+                *(When(pk=id, then=position)
+                  for position, id in enumerate(ids)),
+                default=len(ids)
+            ))
+        return queryset.filter(pk__in=super().filter_queryset(
+            request, queryset, view
+        )[:settings.INGREDIENT_SEARCH_LIMIT].values('pk'))
+
+
+def get_tag_choices():
+    """Варианты фильтра по тегам из кэша вместо запроса DISTINCT."""
+    return [(slug, slug) for slug in get_tag_bits()]
+
 
 class RecipeFilterSet(FilterSet):
     """Фильтр поиска по рецепту."""
-    tags = AllValuesMultipleFilter(field_name='tags__slug')
+    tags = MultipleChoiceFilter(
+        choices=get_tag_choices, method='get_tags'
+    )
+    tags_match = ChoiceFilter(
+        choices=(('any', 'any'), ('all', 'all')), method='get_tags_match'
+    )
     is_favorited = BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = BooleanFilter(method='get_is_in_shopping_cart')
+    search = CharFilter(method='get_search')
+    ordering = ChoiceFilter(
+        choices=(('popular', 'popular'),), method='get_ordering'
+    )
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author', 'tags', 'tags_match', 'is_favorited',
+            'is_in_shopping_cart', 'search', 'ordering',
+        )
+
+    def get_tags(self, queryset, name, value):
+        """
+        Рецепты с любым из тегов, а при tags_match=all - со всеми
+        тегами. Условие проверяется по маске тегов рецепта.
+        """
+        bits = get_tag_bits()
+        mask = 0
+        for slug in value:
+            mask |= 1 << bits[slug]
+        if not mask:
+            return queryset
+        return queryset.with_tags(
+            mask, match_all=self.form.cleaned_data.get('tags_match') == 'all'
+        )
+
+    def get_tags_match(self, queryset, name, value):
+        """Режим фильтра tags, применяется в get_tags."""
+        return queryset
 
     def get_is_favorited(self, queryset, name, value):
         """Фильтр поиска по рецептам, добавленым в избранное."""
         if self.request.user.is_authenticated and value:
-            return queryset.filter(in_favorite__user=self.request.user)
+            return queryset.filter(is_favorited=True)
         return queryset
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         """Фильтр поиска по рецептам, добавленым в продуктовую корзину."""
         if self.request.user.is_authenticated and value:
-            return queryset.filter(cart__user=self.request.user)
+            return queryset.filter(is_in_shopping_cart=True)
         return queryset.all()
+
+    def get_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию рецепта."""
+        return queryset.search(value)
+
+    def get_ordering(self, queryset, name, value):
+        """Сортировка по популярности: избранное, затем корзины."""
+        return queryset.popular()
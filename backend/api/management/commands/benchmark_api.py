@@ -0,0 +1,285 @@
+import base64
+import json
+import math
+import statistics
+import time
+from io import BytesIO
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+READ_ENDPOINTS = (
+    ('users-list', '/api/users/'),
+    ('users-detail', '/api/users/{author}/'),
+    ('users-me', '/api/users/me/'),
+    ('users-subscriptions', '/api/users/subscriptions/?recipes_limit=3'),
+    ('recipes-list', '/api/recipes/'),
+    ('recipes-list-anonymous', '/api/recipes/', False),
+    ('recipes-list-cursor', '/api/recipes/?cursor='),
+    ('recipes-list-author', '/api/recipes/?author={author}'),
+    ('recipes-list-tags', '/api/recipes/?tags={tag}'),
+    ('recipes-list-popular', '/api/recipes/?ordering=popular'),
+    ('recipes-list-favorited', '/api/recipes/?is_favorited=1'),
+    ('recipes-list-in-cart', '/api/recipes/?is_in_shopping_cart=1'),
+    ('recipes-detail', '/api/recipes/{recipe}/'),
+    ('download-txt', '/api/recipes/download_shopping_cart/?format=txt'),
+    ('download-csv', '/api/recipes/download_shopping_cart/?format=csv'),
+    ('download-pdf', '/api/recipes/download_shopping_cart/'),
+    ('tags-list', '/api/tags/'),
+    ('tags-detail', '/api/tags/{tag_id}/'),
+    ('ingredients-list', '/api/ingredients/'),
+    ('ingredients-search', '/api/ingredients/?name={prefix}'),
+    ('ingredients-detail', '/api/ingredients/{ingredient}/'),
+)
+
+WRITE_ENDPOINTS = (
+    ('users-subscribe', 'post', '/api/users/{stranger}/subscribe/'),
+    ('users-unsubscribe', 'delete', '/api/users/{followed}/subscribe/'),
+    ('recipes-favorite', 'post', '/api/recipes/{recipe}/favorite/'),
+    ('recipes-unfavorite', 'delete', '/api/recipes/{favorite}/favorite/'),
+    ('recipes-cart-add', 'post', '/api/recipes/{recipe}/shopping_cart/'),
+    ('recipes-cart-remove', 'delete', '/api/recipes/{cart}/shopping_cart/'),
+    ('recipes-create', 'post', '/api/recipes/', True),
+    ('recipes-update', 'patch', '/api/recipes/{own}/', True),
+    ('recipes-delete', 'delete', '/api/recipes/{own}/'),
+)
+
+
+def percentile(values, fraction):
+    """Возвращает перцентиль методом ближайшего ранга."""
+    values = sorted(values)
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    """
+    Команда 'benchmark_api' выполняет запросы к каждому эндпоинту
+    из api/urls.py через тестовый клиент DRF и записывает перцентили
+    времени ответа и количество SQL-запросов в JSON. Изменяющие
+    запросы выполняются в транзакции, которая откатывается.
+    С ключом --compare результаты сравниваются с прошлым прогоном.
+    """
+    help = 'Измеряет время ответа и число запросов эндпоинтов API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument(
+            '--user', type=int,
+            help='id пользователя, по умолчанию - с самой большой корзиной.'
+        )
+        parser.add_argument(
+            '--only', nargs='+', default=(),
+            help='Измерять только эндпоинты с этими именами.'
+        )
+        parser.add_argument('--output', help='Файл для результатов.')
+        parser.add_argument(
+            '--compare', help='Файл с результатами прошлого прогона.'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=20,
+            help='Допустимый рост p95 в процентах при сравнении.'
+        )
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        self.warmup = options['warmup']
+        user = self.get_user(options['user'])
+        params = self.get_params(user)
+        client = APIClient()
+        client.force_authenticate(user)
+        anonymous = APIClient()
+        only = set(options['only'])
+        results = {}
+        for name, url, *auth in READ_ENDPOINTS:
+            if only and name not in only:
+                continue
+            results[name] = self.measure(
+                client if not auth or auth[0] else anonymous,
+                'get', url.format(**params),
+            )
+        for name, method, url, *with_payload in WRITE_ENDPOINTS:
+            if only and name not in only:
+                continue
+            try:
+                url = url.format(**params)
+            except KeyError:
+                self.stdout.write(f'{name}: нет данных, пропущен')
+                continue
+            results[name] = self.measure(
+                client, method, url,
+                self.get_payload(method, params) if with_payload else None,
+                rollback=True,
+            )
+        report = {
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'vendor': connection.vendor,
+                'user': user.id,
+                'repeat': self.repeat,
+                'users': User.objects.count(),
+                'recipes': Recipe.objects.count(),
+            },
+            'results': results,
+        }
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:28} {result["status"]} '
+                f'p50 {result["p50"]:8.2f} мс  p95 {result["p95"]:8.2f} мс  '
+                f'запросов {result["queries"]}'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        if options['compare']:
+            self.compare(results, options['compare'], options['threshold'])
+
+    def measure(self, client, method, url, payload=None, rollback=False):
+        """Выполняет запрос несколько раз и собирает статистику."""
+        timings, queries, sizes = [], [], []
+        for attempt in range(self.warmup + self.repeat):
+            with transaction.atomic():
+                last_recipe = Recipe.objects.order_by('-id').first()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = getattr(client, method)(
+                        url, payload, format='json'
+                    )
+                    content = (
+                        b''.join(response.streaming_content)
+                        if response.streaming else response.content
+                    )
+                    elapsed = time.perf_counter() - started
+                if rollback:
+                    self.delete_images(last_recipe)
+                    transaction.set_rollback(True)
+            if attempt >= self.warmup:
+                timings.append(elapsed * 1000)
+                queries.append(len(captured))
+                sizes.append(len(content))
+        return {
+            'method': method.upper(),
+            'url': url,
+            'status': response.status_code,
+            'p50': round(percentile(timings, 0.5), 3),
+            'p95': round(percentile(timings, 0.95), 3),
+            'p99': round(percentile(timings, 0.99), 3),
+            'mean': round(statistics.mean(timings), 3),
+            'queries': max(queries),
+            'bytes': max(sizes),
+        }
+
+    @staticmethod
+    def delete_images(last_recipe):
+        """Удаляет картинки рецептов, созданных во время замера."""
+        created = Recipe.objects.filter(
+            id__gt=last_recipe.id if last_recipe else 0
+        )
+        for recipe in created:
+            default_storage.delete(recipe.image.name)
+
+    @staticmethod
+    def get_user(user_id):
+        """Выбирает пользователя, от имени которого выполняются запросы."""
+        if user_id is not None:
+            try:
+                return User.objects.get(id=user_id)
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {user_id} не найден')
+        user = User.objects.annotate(
+            carts=Count('cart')
+        ).order_by('-carts', 'id').first()
+        if user is None:
+            raise CommandError('В базе нет пользователей')
+        return user
+
+    @staticmethod
+    def get_params(user):
+        """Подбирает объекты, на которые ссылаются адреса эндпоинтов."""
+        recipe = Recipe.objects.exclude(author=user).exclude(
+            in_favorite__user=user
+        ).exclude(cart__user=user).first()
+        ingredient = Ingredient.objects.order_by('id').first()
+        tag = Tag.objects.order_by('id').first()
+        if recipe is None or ingredient is None or tag is None:
+            raise CommandError('Сначала заполните базу: generate_dataset')
+        params = {
+            'author': recipe.author_id,
+            'recipe': recipe.id,
+            'tag': tag.slug,
+            'tag_id': tag.id,
+            'ingredient': ingredient.id,
+            'prefix': ingredient.name[:2],
+        }
+        optional = {
+            'stranger': User.objects.exclude(id=user.id).exclude(
+                following__user=user
+            ),
+            'followed': User.objects.filter(following__user=user),
+            'favorite': Recipe.objects.filter(in_favorite__user=user),
+            'cart': Recipe.objects.filter(cart__user=user),
+            'own': Recipe.objects.filter(author=user),
+        }
+        for key, queryset in optional.items():
+            obj_id = queryset.values_list('id', flat=True).first()
+            if obj_id is not None:
+                params[key] = obj_id
+        return params
+
+    @staticmethod
+    def get_payload(method, params):
+        """Собирает тело запроса для создания и изменения рецепта."""
+        ingredients = Ingredient.objects.order_by('id')[:5]
+        payload = {
+            'name': 'Рецепт для замера',
+            'text': 'Описание рецепта для замера',
+            'cooking_time': 10,
+            'tags': [params['tag_id']],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 10}
+                for ingredient in ingredients
+            ],
+        }
+        if method == 'post':
+            buffer = BytesIO()
+            Image.new('RGB', (64, 64), 'white').save(buffer, 'PNG')
+            payload['image'] = 'data:image/png;base64,' + base64.b64encode(
+                buffer.getvalue()
+            ).decode()
+        return payload
+
+    def compare(self, results, path, threshold):
+        """Сравнивает результаты с прошлым прогоном."""
+        try:
+            with open(path, encoding='utf-8') as f:
+                previous = json.load(f)['results']
+        except (OSError, ValueError, KeyError):
+            raise CommandError(f'Не удалось прочитать {path}')
+        regressions = []
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            before = previous[name]
+            change = (result['p95'] / before['p95'] - 1) * 100 if (
+                before['p95']
+            ) else 0
+            self.stdout.write(
+                f'{name:28} p95 {before["p95"]:8.2f} -> {result["p95"]:8.2f} '
+                f'мс ({change:+.0f}%), запросов {before["queries"]} -> '
+                f'{result["queries"]}'
+            )
+            if change > threshold or result['queries'] > before['queries']:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(
+                'Регрессия производительности: ' + ', '.join(regressions)
+            )
@@ -0,0 +1,68 @@
+import base64
+import os
+import time
+import tracemalloc
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from drf_base64.fields import Base64ImageField
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from api.fields import StreamingImageField
+
+FIELDS = (
+    ('Base64ImageField', Base64ImageField),
+    ('StreamingImageField', StreamingImageField),
+)
+
+
+class Command(BaseCommand):
+    """
+    Команда 'benchmark_image_upload' сравнивает пиковый прирост
+    памяти (tracemalloc) и время разбора картинки в base64
+    полями Base64ImageField и StreamingImageField.
+    """
+    help = 'Сравнивает расход памяти при разборе картинок в base64.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', nargs='+', type=float, default=[0.5, 2, 8],
+            help='Размер картинки в мегабайтах.'
+        )
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            data = self.make_data_uri(int(size * 1024 * 1024))
+            self.stdout.write(
+                f'Картинка {size} МБ, строка base64 '
+                f'{len(data) / 1024 / 1024:.1f} МБ'
+            )
+            for title, field_class in FIELDS:
+                field = field_class(use_url=True, max_length=None)
+                tracemalloc.start()
+                started = time.perf_counter()
+                try:
+                    field.to_internal_value(data).close()
+                    result = ''
+                except ValidationError as error:
+                    result = f', отклонено: {error.detail[0]}'
+                elapsed = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self.stdout.write(
+                    f'  {title:20} пик памяти {peak / 1024 / 1024:7.1f} МБ, '
+                    f'{elapsed * 1000:7.1f} мс{result}'
+                )
+
+    @staticmethod
+    def make_data_uri(size):
+        """Создает png из шума размером около size байт."""
+        side = max(int((size / 3) ** 0.5), 1)
+        buffer = BytesIO()
+        Image.frombytes('RGB', (side, side), os.urandom(side * side * 3)).save(
+            buffer, 'PNG', compress_level=1
+        )
+        return 'data:image/png;base64,' + base64.b64encode(
+            buffer.getvalue()
+        ).decode()
@@ -0,0 +1,143 @@
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from api.utils import (SHOPPING_LIST_FORMATS, get_shopping_list_key,
+                       get_shopping_list_path)
+from api.views import RecipeViewSet
+from recipes.models import (Cart, CartIngredient, Ingredient, IngredientRecipe,
+                            Recipe)
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Команда 'benchmark_shopping_list' измеряет время скачивания
+    списка покупок в каждом формате для корзин разного размера.
+    Тестовые данные создаются в транзакции и откатываются.
+    Pdf отрисовывается без ограничения времени ожидания, чтобы
+    замер не превращался в постановку задачи в очередь.
+    """
+    help = 'Сравнивает время выгрузки списка покупок по форматам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', nargs='+', type=int, default=[10, 100, 1000],
+            help='Количество рецептов в корзине.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Количество повторов каждого запроса.'
+        )
+        parser.add_argument(
+            '--ingredients', type=int, default=8,
+            help='Количество ингредиентов в рецепте.'
+        )
+
+    def handle(self, *args, **options):
+        ingredients = list(Ingredient.objects.all())
+        if len(ingredients) < options['ingredients']:
+            raise CommandError(
+                'Недостаточно ингредиентов, выполните load_ingredients'
+            )
+        self.stdout.write(
+            f'{"рецептов":>9} {"формат":>6} {"первый, мс":>11} '
+            f'{"медиана, мс":>12} {"размер, байт":>13}'
+        )
+        for size in options['sizes']:
+            user = None
+            try:
+                with transaction.atomic(), override_settings(
+                    SHOPPING_LIST_WAIT_TIMEOUT=None
+                ):
+                    user = self.create_cart(size, ingredients, options)
+                    for shopping_list_format in SHOPPING_LIST_FORMATS:
+                        self.benchmark(
+                            user, size, shopping_list_format,
+                            options['repeat']
+                        )
+                    self.remove_rendered_pdf(user)
+                    transaction.set_rollback(True)
+            finally:
+                if user is not None:
+                    User.objects.filter(pk=user.pk).delete()
+
+    @staticmethod
+    def create_cart(size, ingredients, options):
+        """
+        Создает пользователя с size рецептами в корзине. Имена
+        уникальны, чтобы не пересекаться с уже существующими данными.
+        """
+        suffix = uuid.uuid4().hex
+        user = User.objects.create(
+            username=f'benchmark-{suffix}',
+            email=f'benchmark-{suffix}@example.com'
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=user,
+                name=f'benchmark {suffix} {number}',
+                text=f'benchmark {suffix} {number}',
+                cooking_time=1,
+            ) for number in range(size)
+        )
+        if not recipes[0].pk:
+            recipes = list(Recipe.objects.filter(author=user))
+        ingredients_in_recipes = IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                recipe=recipe,
+                ingredient=ingredient,
+                amount=random.randint(1, 500),
+            )
+            for recipe in recipes
+            for ingredient in random.sample(
+                ingredients, options['ingredients']
+            )
+        )
+        Cart.objects.bulk_create(
+            Cart(user=user, recipe=recipe) for recipe in recipes
+        )
+        shopping_list = Counter()
+        for ingredient_in_recipe in ingredients_in_recipes:
+            shopping_list[ingredient_in_recipe.ingredient_id] += (
+                ingredient_in_recipe.amount
+            )
+        CartIngredient.objects.apply_changes([user.id], shopping_list)
+        return user
+
+    def benchmark(self, user, size, shopping_list_format, repeat):
+        """Замеряет время полного чтения ответа в заданном формате."""
+        client = APIClient()
+        client.force_authenticate(user)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(
+                '/api/recipes/download_shopping_cart/',
+                {'format': shopping_list_format}
+            )
+            if response.streaming:
+                content = b''.join(response.streaming_content)
+            else:
+                content = response.content
+            timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f'{size:>9} {shopping_list_format:>6} {timings[0]:>11.1f} '
+            f'{statistics.median(timings):>12.1f} {len(content):>13}'
+        )
+
+    @staticmethod
+    def remove_rendered_pdf(user):
+        """Удаляет pdf, сохраненный в кэше во время замера."""
+        shopping_list = list(RecipeViewSet.get_shopping_list(user))
+        path = get_shopping_list_path(get_shopping_list_key(shopping_list))
+        if default_storage.exists(path):
+            default_storage.delete(path)
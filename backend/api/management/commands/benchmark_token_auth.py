@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.authentication import CachedTokenAuthentication, token_cache
+
+AUTHENTICATORS = (
+    ('TokenAuthentication', TokenAuthentication),
+    ('CachedTokenAuthentication', CachedTokenAuthentication),
+)
+
+
+class Command(BaseCommand):
+    """
+    Команда 'benchmark_token_auth' сравнивает число SQL-запросов
+    и время аутентификации по токену с кэшем и без него, а также
+    число запросов к /api/users/me/ с настоящим заголовком токена.
+    """
+    help = 'Сравнивает аутентификацию по токену с кэшем и без.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        token = Token.objects.select_related('user').first()
+        if token is None:
+            raise CommandError('В базе нет токенов')
+        request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Token {token.key}'
+        )
+        token_cache.delete(token.key)
+        for title, authenticator_class in AUTHENTICATORS:
+            authenticator = authenticator_class()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(options['repeat']):
+                    authenticator.authenticate(request)
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{title:26} запросов на {options["repeat"]} вызовов: '
+                f'{len(queries)}, {elapsed / options["repeat"] * 10 ** 6:.0f}'
+                f' мкс на вызов'
+            )
+        token_cache.delete(token.key)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        for attempt in ('первый', 'повторный'):
+            with CaptureQueriesContext(connection) as queries:
+                client.get('/api/users/me/')
+            self.stdout.write(
+                f'GET /api/users/me/, {attempt} запрос, '
+                f'SQL-запросов {len(queries)}'
+            )
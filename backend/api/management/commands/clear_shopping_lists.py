@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    """
+    Команда 'clear_shopping_lists' удаляет из хранилища файлов
+    отрисованные pdf списков покупок старше SHOPPING_LIST_TIMEOUT.
+    Запускается по расписанию, например из cron.
+    """
+    help = 'Удаляет устаревшие pdf списков покупок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age', type=int, default=settings.SHOPPING_LIST_TIMEOUT,
+            help='Возраст файла в секундах, после которого он удаляется.'
+        )
+
+    def handle(self, *args, **options):
+        if not default_storage.exists(settings.SHOPPING_LIST_DIR):
+            self.stdout.write('Удалено файлов: 0')
+            return
+        expired = timezone.now() - timedelta(seconds=options['max_age'])
+        deleted = 0
+        for name in default_storage.listdir(settings.SHOPPING_LIST_DIR)[1]:
+            path = f'{settings.SHOPPING_LIST_DIR}/{name}'
+            if default_storage.get_modified_time(path) < expired:
+                default_storage.delete(path)
+                deleted += 1
+        self.stdout.write(f'Удалено файлов: {deleted}')
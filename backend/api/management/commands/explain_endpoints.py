@@ -0,0 +1,104 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from users.models import User
+
+ENDPOINTS = (
+    ('Список рецептов', '/api/recipes/'),
+    ('Рецепты автора', '/api/recipes/?author={author}'),
+    ('Рецепты по тегу', '/api/recipes/?tags={tag}'),
+    ('Избранное', '/api/recipes/?is_favorited=1'),
+    ('Рецепты в корзине', '/api/recipes/?is_in_shopping_cart=1'),
+    ('Рецепт', '/api/recipes/{recipe}/'),
+    ('Подписки', '/api/users/subscriptions/?recipes_limit=3'),
+    ('Список покупок', '/api/recipes/download_shopping_cart/?format=txt'),
+    ('Поиск ингредиента', '/api/ingredients/?name=а'),
+)
+
+
+class Command(BaseCommand):
+    """
+    Команда 'explain_endpoints' выполняет запросы к API от имени
+    пользователя и выводит план выполнения каждого SQL-запроса.
+    Чтобы сравнить планы до и после индексов, отчет снимается дважды:
+    после отката миграций с индексами и после их применения.
+    """
+    help = 'Выводит планы выполнения SQL-запросов эндпоинтов API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int,
+            help='id пользователя, по умолчанию - с самой большой корзиной.'
+        )
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='Выполнить запросы (EXPLAIN ANALYZE) на PostgreSQL.'
+        )
+        parser.add_argument(
+            '--output', help='Записать отчет в файл вместо вывода.'
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        recipe = Recipe.objects.filter(cart__user=user).first()
+        if recipe is None:
+            raise CommandError('В базе нет рецептов в корзинах')
+        tag = recipe.tags.first()
+        params = {
+            'author': recipe.author_id,
+            'recipe': recipe.id,
+            'tag': tag.slug if tag else '',
+        }
+        client = APIClient()
+        client.force_authenticate(user)
+        explain_options = {'analyze': True} if (
+            options['analyze'] and connection.vendor == 'postgresql'
+        ) else {}
+        prefix = connection.ops.explain_query_prefix(**explain_options)
+        lines = [f'База данных: {connection.vendor}, пользователь: {user.id}']
+        for title, url in ENDPOINTS:
+            url = url.format(**params)
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            lines.append(
+                f'\n=== {title}: GET {url} -> {response.status_code}, '
+                f'запросов: {len(queries)}'
+            )
+            for query in queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                lines.append(f'\n{sql}')
+                with connection.cursor() as cursor:
+                    cursor.execute(f'{prefix} {sql}')
+                    lines.extend(
+                        '    ' + ' '.join(str(column) for column in row)
+                        for row in cursor.fetchall()
+                    )
+        report = '\n'.join(lines) + '\n'
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(report)
+        else:
+            self.stdout.write(report)
+
+    @staticmethod
+    def get_user(user_id):
+        """Выбирает пользователя, от имени которого выполняются запросы."""
+        if user_id is not None:
+            try:
+                return User.objects.get(id=user_id)
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {user_id} не найден')
+        user = User.objects.annotate(
+            carts=Count('cart')
+        ).order_by('-carts', 'id').first()
+        if user is None:
+            raise CommandError('В базе нет пользователей')
+        return user
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import get_cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    """
+    Команда 'response_cache_stats' выводит число попаданий
+    и промахов кэша ответов API.
+    """
+    help = 'Показывает статистику кэша ответов API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*', default=['recipes', 'tags', 'ingredients'],
+            help='Наборы данных, по которым нужна статистика.'
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Обнулить счетчики после вывода.'
+        )
+
+    def handle(self, *args, **options):
+        for name in options['names']:
+            stats = get_cache_stats(name)
+            total = stats['hits'] + stats['misses']
+            ratio = stats['hits'] / total if total else 0
+            self.stdout.write(
+                f'{name}: попаданий {stats["hits"]}, '
+                f'промахов {stats["misses"]}, доля попаданий {ratio:.1%}'
+            )
+            if options['reset']:
+                reset_cache_stats(name)
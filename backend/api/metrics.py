@@ -0,0 +1,196 @@
+import logging
+import time
+import traceback
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import increment
+
+logger = logging.getLogger(__name__)
+
+METRICS_LABELS_COUNT_KEY = 'metrics:labels'
+METRICS_LABEL_KEY = 'metrics:label:{number}'
+METRICS_LABEL_SEEN_KEY = 'metrics:label-seen:{view}:{action}'
+METRICS_KEY = 'metrics:{view}:{action}:{name}'
+
+METRICS = (
+    ('requests_total', 'counter', 'Обработано запросов.', 1),
+    ('db_queries_total', 'counter', 'Выполнено SQL-запросов.', 1),
+    ('db_duration_seconds_total', 'counter',
+     'Время выполнения SQL-запросов.', 10 ** 6),
+    ('serialization_duration_seconds_total', 'counter',
+     'Время сериализации ответов.', 10 ** 6),
+    ('request_duration_seconds_total', 'counter',
+     'Время обработки запросов.', 10 ** 6),
+    ('response_bytes_total', 'counter', 'Размер ответов.', 1),
+    ('duplicate_queries_total', 'counter',
+     'Повторы одинаковых SQL-запросов (N+1).', 1),
+)
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+_pending = defaultdict(Counter)
+_last_flush = time.monotonic()
+_lock = Lock()
+
+
+class RequestMetrics:
+    """
+    Показатели одного запроса: SQL-запросы и их время, время
+    сериализации. Объект подключается к соединению с базой через
+    execute_wrapper и ищет запросы, которые повторяются с разными
+    параметрами - признак N+1.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0
+        self.serialization_time = 0
+        self.serialization_depth = 0
+        self.statements = Counter()
+        self.call_sites = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.statements[sql] += 1
+            if (
+                self.statements[sql]
+                == settings.METRICS_DUPLICATE_QUERY_THRESHOLD
+            ):
+                self.call_sites[sql] = self.get_call_site()
+
+    @staticmethod
+    def get_call_site():
+        """Возвращает строку кода проекта, из которой выполнен запрос."""
+        for frame in reversed(traceback.extract_stack()):
+            if (
+                frame.filename.startswith(settings.BASE_DIR)
+                and 'site-packages' not in frame.filename
+                and frame.filename != __file__
+            ):
+                return f'{frame.filename}:{frame.lineno} {frame.line}'
+        return 'неизвестно'
+
+    @property
+    def duplicate_queries(self):
+        """Количество лишних повторов запросов, попавших под порог."""
+        return sum(
+            self.statements[sql] - 1 for sql in self.call_sites
+        )
+
+    def log_duplicates(self, label):
+        """Пишет в лог запросы, повторенные не меньше порога."""
+        for sql, call_site in self.call_sites.items():
+            logger.warning(
+                '%s: запрос выполнен %s раз, %s\n%s',
+                label, self.statements[sql], call_site, sql,
+            )
+
+
+class SerializationTimer:
+    """Засекает время сериализации текущего запроса."""
+
+    def __enter__(self):
+        self.metrics = current_metrics.get()
+        if self.metrics is not None:
+            self.metrics.serialization_depth += 1
+            if self.metrics.serialization_depth == 1:
+                self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.metrics is not None:
+            self.metrics.serialization_depth -= 1
+            if self.metrics.serialization_depth == 0:
+                self.metrics.serialization_time += (
+                    time.perf_counter() - self.started
+                )
+
+
+def register_label(view, action):
+    """
+    Добавляет пару (представление, действие) в список меток в кэше.
+    Метка регистрируется один раз через cache.add, номер ей выдает
+    атомарный cache.incr, поэтому параллельные процессы не затирают
+    метки друг друга.
+    """
+    if cache.add(METRICS_LABEL_SEEN_KEY.format(view=view, action=action),
+                 True, None):
+        cache.add(METRICS_LABELS_COUNT_KEY, 0, None)
+        number = cache.incr(METRICS_LABELS_COUNT_KEY)
+        cache.set(
+            METRICS_LABEL_KEY.format(number=number), (view, action), None
+        )
+
+
+def flush_metrics():
+    """Переносит накопленные в процессе счетчики в кэш."""
+    global _last_flush
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    for (view, action), values in pending.items():
+        register_label(view, action)
+        for name, value in values.items():
+            if value:
+                increment(
+                    METRICS_KEY.format(view=view, action=action, name=name),
+                    value,
+                )
+
+
+def record_metrics(view, action, values):
+    """
+    Добавляет показатели запроса к счетчикам процесса. Раз
+    в METRICS_FLUSH_INTERVAL секунд счетчики переносятся в кэш,
+    где с общим бэкендом кэша суммируются по всем процессам.
+    """
+    with _lock:
+        counter = _pending[(view, action)]
+        for name, _, _, scale in METRICS:
+            counter[name] += round(values.get(name, 0) * scale)
+        if time.monotonic() - _last_flush < settings.METRICS_FLUSH_INTERVAL:
+            return
+    flush_metrics()
+
+
+def get_labels():
+    """Возвращает зарегистрированные пары (представление, действие)."""
+    count = cache.get(METRICS_LABELS_COUNT_KEY, 0)
+    return sorted(set(cache.get_many([
+        METRICS_LABEL_KEY.format(number=number)
+        for number in range(1, count + 1)
+    ]).values()))
+
+
+def render_metrics():
+    """Возвращает счетчики в текстовом формате Prometheus."""
+    flush_metrics()
+    labels = get_labels()
+    values = cache.get_many([
+        METRICS_KEY.format(view=view, action=action, name=name)
+        for view, action in labels
+        for name, *_ in METRICS
+    ])
+    lines = []
+    for name, kind, description, scale in METRICS:
+        lines.append(f'# HELP foodgram_{name} {description}')
+        lines.append(f'# TYPE foodgram_{name} {kind}')
+        for view, action in labels:
+            value = values.get(
+                METRICS_KEY.format(view=view, action=action, name=name), 0
+            )
+            lines.append(
+                f'foodgram_{name}{{view="{view}",action="{action}"}} '
+                f'{value / scale if scale > 1 else value}'
+            )
+    return '\n'.join(lines) + '\n'
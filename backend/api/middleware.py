@@ -0,0 +1,100 @@
+import random
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .metrics import RequestMetrics, current_metrics, record_metrics
+
+
+class RequestMetricsMiddleware:
+    """
+    Измеряет выборку запросов: количество и время SQL-запросов,
+    время сериализации, общее время и размер ответа. Показатели
+    суммируются по представлению и действию (RecipeViewSet.list,
+    UsersViewSet.subscriptions) и отдаются в заголовке Server-Timing.
+    Доля измеряемых запросов задается METRICS_SAMPLE_RATE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(metrics):
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        duration = time.perf_counter() - started
+        view, action = getattr(request, '_metrics_label', ('unknown', '-'))
+        metrics.log_duplicates(f'{view}.{action}')
+        record_metrics(view, action, {
+            'requests_total': 1,
+            'db_queries_total': metrics.queries,
+            'db_duration_seconds_total': metrics.db_time,
+            'serialization_duration_seconds_total': (
+                metrics.serialization_time
+            ),
+            'request_duration_seconds_total': duration,
+            'response_bytes_total': self.get_response_size(response),
+            'duplicate_queries_total': metrics.duplicate_queries,
+        })
+        if response.streaming and not response.has_header('Content-Length'):
+            response.streaming_content = self.count_streamed_bytes(
+                response.streaming_content, view, action
+            )
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = ', '.join((
+                f'db;dur={metrics.db_time * 1000:.1f};'
+                f'desc="{metrics.queries} queries"',
+                f'serialization;dur={metrics.serialization_time * 1000:.1f}',
+                f'total;dur={duration * 1000:.1f}',
+            ))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """
+        Определяет представление и действие DRF по параметрам,
+        с которыми as_view() создал функцию представления.
+        """
+        view_class = getattr(view_func, 'cls', None)
+        if view_class is None:
+            request._metrics_label = (
+                f'{view_func.__module__}.{view_func.__name__}', '-'
+            )
+            return None
+        method = request.method.lower()
+        actions = getattr(view_func, 'actions', None) or {}
+        request._metrics_label = (
+            view_class.__name__, actions.get(method, method)
+        )
+        return None
+
+    @staticmethod
+    def get_response_size(response):
+        """
+        Размер тела ответа; для потоковых ответов - Content-Length,
+        а без него размер учитывает count_streamed_bytes по мере отдачи.
+        """
+        if response.streaming:
+            return int(response.get('Content-Length', 0))
+        return len(response.content)
+
+    @staticmethod
+    def count_streamed_bytes(content, view, action):
+        """
+        Отдает части потокового ответа и после отдачи, в том числе
+        прерванной клиентом, добавляет их размер к response_bytes_total.
+        """
+        size = 0
+        try:
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            record_metrics(view, action, {'response_bytes_total': size})
@@ -0,0 +1,126 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from .cache import get_version, record_cache_result
+from .metrics import SerializationTimer
+
+RESPONSE_CACHE_KEY = 'response:{name}:{version}:{path}'
+
+
+class ConditionalCacheMixin:
+    """
+    Кэширование ответов, которые меняются редко.
+    Ответ помечается ETag и Last-Modified по версии данных
+    cache_version_name, на повторный запрос клиента с теми же
+    значениями отдается 304. Готовый JSON хранится в кэше, поэтому
+    при попадании в кэш ни ORM, ни сериализатор не вызываются.
+    С cache_anonymous_only кэшируются только ответы анонимам.
+    Запросы, для которых is_cacheable ложно, не кэшируются.
+    Версия читается из кэша на каждом запросе и в памяти процесса
+    не запоминается, поэтому изменение, сделанное в одном воркере,
+    сразу меняет ETag во всех, если кэш общий (см. CACHE_BACKEND).
+    """
+    cache_version_name = None
+    cache_anonymous_only = False
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def is_cacheable(self, request):
+        """Можно ли кэшировать ответ на запрос."""
+        return True
+
+    @staticmethod
+    def get_cache_path(request):
+        """
+        Путь запроса с упорядоченными параметрами, чтобы запросы,
+        отличающиеся только порядком параметров, попадали в один ключ.
+        """
+        params = sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            for value in values if value
+        )
+        return f'{request.path}?{urlencode(params)}'
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """Отдает ответ из кэша или формирует и кэширует его."""
+        if (
+            not isinstance(request.accepted_renderer, JSONRenderer)
+            or self.cache_anonymous_only and request.user.is_authenticated
+            or not self.is_cacheable(request)
+        ):
+            return handler(request, *args, **kwargs)
+        version = get_version(self.cache_version_name)
+        response = HttpResponse(content_type='application/json')
+        response['ETag'] = quote_etag(f'{self.cache_version_name}-{version}')
+        response['Last-Modified'] = http_date(version // 10 ** 9)
+        patch_cache_control(response, no_cache=True)
+        if self.cache_anonymous_only:
+            patch_vary_headers(response, ('Authorization',))
+        conditional_response = get_conditional_response(
+            request,
+            etag=response['ETag'],
+            last_modified=version // 10 ** 9,
+            response=response,
+        )
+        if conditional_response is not response:
+            return conditional_response
+        key = RESPONSE_CACHE_KEY.format(
+            name=self.cache_version_name,
+            version=version,
+            path=self.get_cache_path(request),
+        )
+        content = cache.get(key)
+        record_cache_result(self.cache_version_name, content is not None)
+        if content is None:
+            drf_response = handler(request, *args, **kwargs)
+            if drf_response.status_code != 200:
+                return drf_response
+            content = JSONRenderer().render(drf_response.data)
+            cache.set(key, content, settings.RESPONSE_CACHE_TIMEOUT)
+        response.content = content
+        return response
+
+
+class SerializationTimingMixin:
+    """
+    Учитывает время to_representation сериализаторов представления
+    в показателях запроса. Замер подключается к сериализаторам,
+    созданным через get_serializer и get_action_serializer, сами
+    классы сериализаторов о нем не знают.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        return self.time_serializer(super().get_serializer(*args, **kwargs))
+
+    def get_action_serializer(self, serializer_class, *args, **kwargs):
+        """Создает сериализатор действия с контекстом представления."""
+        kwargs['context'] = {
+            **self.get_serializer_context(), **kwargs.get('context', {})
+        }
+        return self.time_serializer(serializer_class(*args, **kwargs))
+
+    @staticmethod
+    def time_serializer(serializer):
+        """Оборачивает to_representation сериализатора замером времени."""
+        to_representation = serializer.to_representation
+
+        def timed_to_representation(instance):
+            with SerializationTimer():
+                return to_representation(instance)
+
+        serializer.to_representation = timed_to_representation
+        return serializer
@@ -0,0 +1,14 @@
+from rest_framework.negotiation import BaseContentNegotiation
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    """
+    Всегда отвечает первым из рендеров представления.
+    Используется там, где параметр format и заголовок Accept
+    выбирают формат файла, а не формат ответа API.
+    """
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix):
+        return renderers[0], renderers[0].media_type
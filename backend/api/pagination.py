@@ -1,8 +1,165 @@
+import json
+from base64 import b64decode, b64encode
+from functools import reduce
+from operator import or_
+
 from django.conf import settings
-from rest_framework.pagination import PageNumberPagination
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Постраничный вывод по курсору: курсор хранит значения всех полей
+    сортировки последней строки страницы, а следующая страница
+    выбирается условием на эти значения, без OFFSET и без подсчета
+    общего количества. Последнее поле ordering должно быть уникальным.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = settings.COUNT_RECIPES_IN_PAGE
+    ordering = ('id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        """Размер страницы из параметра limit или по умолчанию."""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return page_size if page_size > 0 else self.page_size
+
+    def get_fields(self, queryset):
+        """Поля модели, соответствующие полям сортировки."""
+        return [
+            queryset.model._meta.get_field(name.lstrip('-'))
+            for name in self.ordering
+        ]
+
+    def decode_cursor(self, request, fields):
+        """Возвращает (значения полей, признак движения назад) курсора."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(b64decode(encoded.encode()).decode())
+            values = cursor['p']
+            if len(values) != len(fields):
+                raise ValueError
+            position = [
+                field.to_python(value) for field, value in zip(fields, values)
+            ]
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(cursor.get('r'))
+
+    def encode_cursor(self, instance, reverse):
+        """Ссылка на страницу после (или перед) строкой instance."""
+        values = [
+            field.value_to_string(instance) for field in self.fields
+        ]
+        encoded = b64encode(
+            json.dumps({'p': values, 'r': int(reverse)}).encode()
+        ).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    @staticmethod
+    def get_position_filter(ordering, position):
+        """
+        Условие "строка идет после position" для составной сортировки:
+        (a > x) OR (a = x AND b > y) OR ... с учетом направления полей.
+        """
+        conditions = []
+        for index, name in enumerate(ordering):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            equal = {
+                previous.lstrip('-'): value
+                for previous, value in zip(ordering[:index], position)
+            }
+            conditions.append(Q(
+                **equal, **{f'{name.lstrip("-")}__{lookup}': position[index]}
+            ))
+        return reduce(or_, conditions)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.fields = self.get_fields(queryset)
+        position, reverse = self.decode_cursor(request, self.fields)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                name[1:] if name.startswith('-') else f'-{name}'
+                for name in ordering
+            )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_position_filter(ordering, position)
+            )
+        page = list(queryset[:self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if reverse:
+            page.reverse()
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = position is not None if not reverse else has_more
+        self.page = page
+        return page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
 
 
 class CustomPagination(PageNumberPagination):
-    """Количество рецептов на главной странице."""
+    """
+    Количество рецептов на главной странице.
+    С параметром cursor страницы выбираются по курсору в порядке
+    cursor_ordering представления. Если для запроса cursor_ordering
+    равен None, постраничный вывод по курсору недоступен.
+    """
     page_size_query_param = 'limit'
     page_size = settings.COUNT_RECIPES_IN_PAGE
+    cursor_query_param = 'cursor'
+    keyset_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        ordering = getattr(view, 'cursor_ordering', ('id',))
+        if ordering is None:
+            raise ValidationError({
+                self.cursor_query_param: settings.CURSOR_ORDERING_ERROR
+            })
+        self.keyset_paginator = KeysetPagination()
+        self.keyset_paginator.ordering = ordering
+        return self.keyset_paginator.paginate_queryset(
+            queryset, request, view
+        )
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,67 @@
+from io import BytesIO
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = settings.REQUEST_TOO_LARGE_ERROR
+    default_code = 'payload_too_large'
+
+
+def check_content_length(parser_context):
+    """Отклоняет запрос по Content-Length, не читая тело."""
+    request = parser_context['request']
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    if length > settings.RECIPE_UPLOAD_MAX_BODY_SIZE:
+        raise PayloadTooLarge()
+
+
+def read_limited(stream, parser_context):
+    """
+    Читает тело целиком, но не дальше RECIPE_UPLOAD_MAX_BODY_SIZE,
+    даже если Content-Length не передан.
+    """
+    check_content_length(parser_context)
+    body = stream.read(settings.RECIPE_UPLOAD_MAX_BODY_SIZE + 1)
+    if len(body) > settings.RECIPE_UPLOAD_MAX_BODY_SIZE:
+        raise PayloadTooLarge()
+    return BytesIO(body)
+
+
+class LimitedJSONParser(JSONParser):
+    """
+    JSON с ограничением размера тела RECIPE_UPLOAD_MAX_BODY_SIZE.
+    Без Content-Length тело читается не дальше лимита.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return super().parse(
+            read_limited(stream, parser_context), media_type, parser_context
+        )
+
+
+class LimitedFormParser(FormParser):
+    """application/x-www-form-urlencoded с ограничением размера тела."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return super().parse(
+            read_limited(stream, parser_context), media_type, parser_context
+        )
+
+
+class LimitedMultiPartParser(MultiPartParser):
+    """
+    multipart/form-data с ограничением размера тела. Файлы Django
+    сам пишет на диск частями, не держа их в памяти целиком.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        check_content_length(parser_context)
+        return super().parse(stream, media_type, parser_context)
@@ -1,11 +1,20 @@
 from rest_framework.permissions import SAFE_METHODS, BasePermission
 
-from users.models import UserRole
-
 
 class IsAuthorOrAdminOrReadOnly(BasePermission):
-    """Редактирование доступно только автору либо админу."""
+    """
+    Редактирование доступно только автору либо админу.
+    Автор сравнивается по author_id, поэтому проверка
+    не загружает автора из базы.
+    """
     def has_object_permission(self, request, view, obj):
         return (request.method in SAFE_METHODS
-                or obj.author == request.user
-                or request.user.role == UserRole.ADMIN)
+                or obj.author_id == request.user.id
+                or request.user.is_admin)
+
+
+class IsAdmin(BasePermission):
+    """Доступ только администраторам."""
+    def has_permission(self, request, view):
+        return (request.user.is_authenticated
+                and (request.user.is_admin or request.user.is_superuser))
@@ -1,15 +1,21 @@
+import json
+from collections import Counter
+
 from django.conf import settings
-from django.db.transaction import atomic
+from django.db import transaction
+from django.http import QueryDict
 from django.shortcuts import get_object_or_404
 from djoser.serializers import UserSerializer
-from drf_base64.fields import Base64ImageField
-from rest_framework.serializers import (IntegerField, ModelSerializer,
+from rest_framework.serializers import (ImageField, IntegerField, ListField,
+                                        ModelSerializer,
                                         PrimaryKeyRelatedField,
                                         SerializerMethodField,
                                         SlugRelatedField, ValidationError)
 
-from recipes.models import (Cart, Favorite, Ingredient, IngredientRecipe,
-                            Recipe, Tag)
+from .cache import bump_version, get_following_ids
+from .fields import StreamingImageField
+from recipes.models import (Cart, CartIngredient, Favorite, Ingredient,
+                            IngredientRecipe, Recipe, Tag)
 from users.models import Follow, User
 
 
@@ -29,8 +35,7 @@ class UsersSerializer(UserSerializer):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
-        return Follow.objects.filter(
-            user=request.user, author=obj).exists()
+        return obj.id in get_following_ids(request)
 
 
 class FollowSerializer(ModelSerializer):
@@ -55,11 +60,16 @@ class FollowSerializer(ModelSerializer):
             })
         return data
 
+    @transaction.atomic
+    def create(self, validated_data):
+        """Создает подписку вместе с обновлением счетчика автора."""
+        return super().create(validated_data)
+
     def to_representation(self, instance):
         """Отображает подписки."""
         return FollowListSerializer(
             instance.author,
-            context={'request': self.context.get('request')}
+            context=self.context
         ).data
 
 
@@ -77,37 +87,37 @@ class FollowListSerializer(ModelSerializer):
         )
 
     def get_recipes_count(self, author):
-        """Получает количество рецептов автора."""
-        return Recipe.objects.filter(author=author).count()
+        """Получает количество рецептов автора из счетчика."""
+        return author.recipes_count
 
     def get_recipes(self, author):
         """Получает рецепты автора."""
-        queryset = self.context.get('request')
-        recipes_limit = queryset.query_params.get('recipes_limit')
-        if not recipes_limit:
-            return RecipeShortInfo(
-                Recipe.objects.filter(author=author),
-                many=True, context={'request': queryset}
-            ).data
+        recipes = getattr(author, 'recipes_preview', None)
+        if recipes is None:
+            recipes = author.recipes.all()
+            recipes_limit = self.context.get('recipes_limit')
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         return RecipeShortInfo(
-            Recipe.objects.filter(author=author)[:int(recipes_limit)],
-            many=True,
-            context={'request': queryset}
+            recipes, many=True, context=self.context
         ).data
 
     def get_is_subscribed(self, author):
-        """Проверяет подписан ли пользователь на автора."""
-        return Follow.objects.filter(
-            user=self.context.get('request').user,
-            author=author
-        ).exists()
+        """Пользователь подписан на всех авторов из списка."""
+        return True
 
 
 class TagSerializer(ModelSerializer):
     """Сериализатор для тегов."""
     class Meta:
         model = Tag
-        fields = '__all__'
+        fields = ('id', 'name', 'color', 'slug')
+
+    def validate(self, data):
+        """Проверяет, что для нового тега остался свободный бит маски."""
+        if self.instance is None and Tag.get_free_bit() is None:
+            raise ValidationError(settings.TAGS_LIMIT_ERROR)
+        return data
 
 
 class IngredientSerializer(ModelSerializer):
@@ -148,6 +158,31 @@ class IngredientRecipeSerializer(ModelSerializer):
         )
 
 
+class RecipeImageField(ImageField):
+    """
+    Фото рецепта только для чтения. В списках отдается миниатюра
+    текущего фото, а пока она не готова или обработка не удалась -
+    само загруженное фото.
+    """
+
+    def __init__(self, thumbnail=None, **kwargs):
+        self.thumbnail = thumbnail
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def use_thumbnail(self):
+        """Отдавать ли миниатюру: задано явно или по действию view."""
+        if self.thumbnail is not None:
+            return self.thumbnail
+        view = self.context.get('view')
+        return getattr(view, 'action', None) == 'list'
+
+    def get_attribute(self, instance):
+        if self.use_thumbnail() and instance.image_processed:
+            return instance.thumbnail
+        return instance.image
+
+
 class RecipeSerializer(ModelSerializer):
     """Сериализатор для рецептов."""
     tags = TagSerializer(many=True, read_only=True)
@@ -157,6 +192,7 @@ class RecipeSerializer(ModelSerializer):
         source='ingridients_recipe',
     )
     author = UsersSerializer(read_only=True)
+    image = RecipeImageField()
     is_in_shopping_cart = SerializerMethodField(read_only=True)
     is_favorited = SerializerMethodField(read_only=True)
 
@@ -173,6 +209,8 @@ class RecipeSerializer(ModelSerializer):
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return Favorite.objects.filter(
             user=request.user, recipe__id=obj.id).exists()
 
@@ -181,16 +219,18 @@ class RecipeSerializer(ModelSerializer):
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return Cart.objects.filter(
             user=request.user, recipe__id=obj.id).exists()
 
 
 class CreateIngredientRecipeSerializer(ModelSerializer):
-    """Сериализатор для создания ингредиента."""
-    id = PrimaryKeyRelatedField(
-        source='ingredient',
-        queryset=Ingredient.objects.all()
-    )
+    """
+    Сериализатор для создания ингредиента. Ингредиенты по id
+    загружаются одним запросом в CreateRecipeSerializer.validate.
+    """
+    id = IntegerField()
 
     class Meta:
         model = IngredientRecipe
@@ -217,10 +257,10 @@ class CreateIngredientRecipeSerializer(ModelSerializer):
 
 class CreateRecipeSerializer(ModelSerializer):
     """Сериализатор для создания рецепта."""
-    image = Base64ImageField(use_url=True, max_length=None)
+    image = StreamingImageField(use_url=True, max_length=None)
     author = UsersSerializer(read_only=True)
     ingredients = CreateIngredientRecipeSerializer(many=True)
-    tags = PrimaryKeyRelatedField(queryset=Tag.objects.all(), many=True)
+    tags = ListField(child=IntegerField())
     cooking_time = IntegerField()
 
     class Meta:
@@ -232,6 +272,8 @@ class CreateRecipeSerializer(ModelSerializer):
 
     def create_ingredients(self, recipe, ingredients):
         """Создает игредиенты."""
+        if not ingredients:
+            return
         IngredientRecipe.objects.bulk_create([
             IngredientRecipe(
                 recipe=recipe,
@@ -240,24 +282,85 @@ class CreateRecipeSerializer(ModelSerializer):
             ) for ingredient in ingredients
         ])
 
+    def to_internal_value(self, data):
+        """
+        Принимает рецепт и в JSON, и в multipart/form-data. В форме
+        ingredients передаются JSON-строкой, tags - JSON-строкой
+        или повторяющимся полем.
+        """
+        if isinstance(data, QueryDict):
+            data = self.parse_multipart(data)
+        return super().to_internal_value(data)
+
+    @staticmethod
+    def parse_multipart(data):
+        """Приводит поля формы к структуре JSON-запроса."""
+        parsed = data.dict()
+        tags = data.getlist('tags')
+        if len(tags) > 1:
+            parsed['tags'] = tags
+        for field in ('ingredients', 'tags'):
+            if isinstance(parsed.get(field), str):
+                try:
+                    parsed[field] = json.loads(parsed[field])
+                except ValueError:
+                    raise ValidationError({
+                        field: settings.MULTIPART_JSON_ERROR
+                    })
+        return parsed
+
+    @staticmethod
+    def get_objects(model, ids, duplicate_error, not_found_error):
+        """
+        Загружает объекты по id одним запросом. Возвращает объекты
+        в порядке ids и список ошибок: повторы и ненайденные id.
+        """
+        errors = []
+        duplicates = {
+            obj_id for obj_id, count in Counter(ids).items() if count > 1
+        }
+        if duplicates:
+            errors.append(duplicate_error)
+        objects = model.objects.in_bulk(set(ids))
+        missing = [obj_id for obj_id in dict.fromkeys(ids)
+                   if obj_id not in objects]
+        if missing:
+            errors.append(not_found_error.format(
+                ids=', '.join(map(str, missing))
+            ))
+        return [objects.get(obj_id) for obj_id in ids], errors
+
     def validate(self, data):
-        """Проверяет игредиенты в рецепте и время приготовления."""
-        ingredients = self.initial_data.get('ingredients')
-        ingredients_list = []
-        for ingredient in ingredients:
-            ingredient_id = ingredient['id']
-            if ingredient_id in ingredients_list:
-                raise ValidationError(
-                    settings.ADD_INGREDIENTS_IN_RECIPES_ERROR
-                )
-            ingredients_list.append(ingredient_id)
-        if data['cooking_time'] <= settings.MIN_COOKING_TIME:
-            raise ValidationError(
-                settings.MIN_COOKING_TIME_ERROR
+        """Проверяет игредиенты и теги рецепта и время приготовления."""
+        errors = {}
+        if 'ingredients' in data:
+            ingredients, errors['ingredients'] = self.get_objects(
+                Ingredient,
+                [ingredient['id'] for ingredient in data['ingredients']],
+                settings.ADD_INGREDIENTS_IN_RECIPES_ERROR,
+                settings.INGREDIENTS_NOT_FOUND_ERROR,
+            )
+            data['ingredients'] = [
+                {'ingredient': ingredient, 'amount': item['amount']}
+                for ingredient, item in zip(ingredients, data['ingredients'])
+            ]
+        if 'tags' in data:
+            data['tags'], errors['tags'] = self.get_objects(
+                Tag,
+                data['tags'],
+                settings.ADD_TAGS_IN_RECIPES_ERROR,
+                settings.TAGS_NOT_FOUND_ERROR,
             )
+        if data.get(
+            'cooking_time', settings.MIN_COOKING_TIME + 1
+        ) <= settings.MIN_COOKING_TIME:
+            errors['cooking_time'] = [settings.MIN_COOKING_TIME_ERROR]
+        errors = {field: error for field, error in errors.items() if error}
+        if errors:
+            raise ValidationError(errors)
         return data
 
-    @atomic
+    @transaction.atomic
     def create(self, validated_data):
         """Создает рецепт."""
         request = self.context.get('request')
@@ -265,33 +368,124 @@ class CreateRecipeSerializer(ModelSerializer):
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(
             author=request.user,
+            tags_mask=Tag.get_mask(tags),
             **validated_data
         )
         self.create_ingredients(recipe, ingredients)
-        recipe.tags.set(tags)
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+            for tag in tags
+        )
         return recipe
 
-    @atomic
+    def update_ingredients(self, recipe, ingredients):
+        """
+        Сравнивает ингредиенты рецепта с присланными и выполняет
+        только нужные вставку, изменение и удаление строк.
+        """
+        rows = {
+            row.ingredient_id: row
+            for row in IngredientRecipe.objects.filter(recipe=recipe)
+        }
+        old_amounts = {
+            ingredient_id: row.amount for ingredient_id, row in rows.items()
+        }
+        new_amounts = {
+            ingredient['ingredient'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        if new_amounts == old_amounts:
+            return False
+        changed = []
+        for ingredient_id, row in rows.items():
+            if new_amounts.get(ingredient_id, row.amount) != row.amount:
+                row.amount = new_amounts[ingredient_id]
+                changed.append(row)
+        if changed:
+            IngredientRecipe.objects.bulk_update(changed, ['amount'])
+        self.create_ingredients(recipe, [
+            ingredient for ingredient in ingredients
+            if ingredient['ingredient'].id not in rows
+        ])
+        removed = rows.keys() - new_amounts.keys()
+        if removed:
+            IngredientRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        CartIngredient.objects.change_recipe(
+            recipe.id, old_amounts, new_amounts
+        )
+        return True
+
+    @staticmethod
+    def update_tags(recipe, tags):
+        """
+        Добавляет новые и удаляет убранные теги рецепта. Маска тегов
+        сохраняется вместе с рецептом.
+        """
+        recipe.tags_mask = Tag.get_mask(tags)
+        through = Recipe.tags.through
+        old_ids = set(through.objects.filter(
+            recipe=recipe
+        ).values_list('tag_id', flat=True))
+        new_ids = {tag.id for tag in tags}
+        if new_ids - old_ids:
+            through.objects.bulk_create(
+                through(recipe_id=recipe.id, tag_id=tag_id)
+                for tag_id in new_ids - old_ids
+            )
+        if old_ids - new_ids:
+            through.objects.filter(
+                recipe=recipe, tag_id__in=old_ids - new_ids
+            ).delete()
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        """Редактирует рецепт."""
-        ingredients = validated_data.pop('ingredients')
-        recipe = instance
-        IngredientRecipe.objects.filter(recipe=recipe).delete()
-        self.create_ingredients(recipe, ingredients)
-        return super().update(recipe, validated_data)
+        """
+        Редактирует рецепт. Сохраняются только изменившиеся поля,
+        рецепт без изменений не сохраняется вовсе.
+        """
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        ingredients_changed = (
+            ingredients is not None
+            and self.update_ingredients(instance, ingredients)
+        )
+        old_mask = instance.tags_mask
+        if tags is not None:
+            self.update_tags(instance, tags)
+        update_fields = [
+            name for name, value in validated_data.items()
+            if name == 'image' or getattr(instance, name) != value
+        ]
+        for name in update_fields:
+            setattr(instance, name, validated_data[name])
+        if instance.tags_mask != old_mask:
+            update_fields.append('tags_mask')
+        if update_fields:
+            instance.save(update_fields=update_fields)
+        elif ingredients_changed:
+            transaction.on_commit(lambda: bump_version('recipes'))
+        return instance
 
     def to_representation(self, instance):
         """Отображает созданный/отредактированный рецепт."""
+        request = self.context.get('request')
+        instance = Recipe.objects.with_read_graph().with_user_flags(
+            request.user
+        ).get(pk=instance.pk)
         return RecipeSerializer(
             instance,
             context={
-                'request': self.context.get('request'),
+                'request': request,
             }
         ).data
 
 
 class RecipeShortInfo(ModelSerializer):
     """Сериализатор для страницы рецепта."""
+    image = RecipeImageField(thumbnail=True)
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
@@ -315,6 +509,11 @@ class CartSerializer(ModelSerializer):
             })
         return data
 
+    @transaction.atomic
+    def create(self, validated_data):
+        """Добавляет рецепт в корзину, список покупок и счетчик."""
+        return super().create(validated_data)
+
     def to_representation(self, instance):
         """Отображает информацию о рецепте."""
         request = self.context.get('request')
@@ -342,6 +541,11 @@ class FavoriteSerializer(ModelSerializer):
             })
         return data
 
+    @transaction.atomic
+    def create(self, validated_data):
+        """Добавляет рецепт в избранное вместе с обновлением счетчика."""
+        return super().create(validated_data)
+
     def to_representation(self, instance):
         """Отображает информацию о рецепте."""
         request = self.context.get('request')
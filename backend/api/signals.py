@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .cache import bump_version, invalidate_following_ids
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from recipes.signals import ingredients_imported, recipe_images_processed
+from users.models import Follow, User
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(ingredients_imported)
+def ingredients_changed(sender, **kwargs):
+    """Сбрасывает индекс и кэш ингредиентов после изменения справочника."""
+    bump_version('ingredients')
+    recipes_changed(sender)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tags_changed(sender, **kwargs):
+    """Сбрасывает кэш тегов после изменения справочника."""
+    bump_version('tags')
+    recipes_changed(sender)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(recipe_images_processed)
+def recipes_changed(sender, **kwargs):
+    """
+    Сбрасывает кэш рецептов после фиксации транзакции, чтобы
+    в кэш не попала страница, собранная до сохранения изменений.
+    """
+    transaction.on_commit(lambda: bump_version('recipes'))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def author_changed(sender, update_fields=None, **kwargs):
+    """Сбрасывает кэш рецептов после изменения данных автора."""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    recipes_changed(sender)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def following_changed(sender, instance, **kwargs):
+    """
+    Сбрасывает кэш подписок пользователя после фиксации транзакции,
+    при подписке через API, админку или каскадном удалении.
+    """
+    transaction.on_commit(
+        lambda: invalidate_following_ids(instance.user_id)
+    )
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Убирает токен из кэша после выхода пользователя."""
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    """
+    Сбрасывает кэш токенов пользователя после смены пароля,
+    роли, деактивации и других изменений, кроме входа.
+    """
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    token_cache.delete(*Token.objects.filter(
+        user=instance
+    ).values_list('key', flat=True))
@@ -0,0 +1,38 @@
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .utils import FoodgramTestCase
+from api.authentication import TokenCache, token_cache
+
+
+class TokenCacheTest(FoodgramTestCase):
+    """Выход пользователя сразу отзывает токен из кэша."""
+
+    def setUp(self):
+        super().setUp()
+        token_cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def assert_logout_revokes_token(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_logout(self):
+        self.assert_logout_revokes_token()
+
+    @override_settings(TOKEN_CACHE_SHARED=True)
+    def test_logout_shared(self):
+        self.assert_logout_revokes_token()
+
+    @override_settings(TOKEN_CACHE_SHARED=True)
+    def test_logout_in_other_process(self):
+        other_process = TokenCache()
+        self.client.get('/api/users/me/')
+        self.assertIsNotNone(other_process.get(self.token.key))
+        self.client.post('/api/auth/token/logout/')
+        self.assertIsNone(other_process.get(self.token.key))
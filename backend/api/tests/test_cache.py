@@ -0,0 +1,102 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIClient
+
+from .utils import FoodgramTestCase
+from api.checks import shared_cache_check
+from recipes.models import Favorite
+from users.models import Follow
+
+
+@override_settings(FOLLOWING_CACHE_TIMEOUT=60)
+class FollowingCacheTest(FoodgramTestCase):
+    """Кэш подписок сбрасывается при любом изменении подписок."""
+
+    def is_subscribed(self, author):
+        response = self.client.get(f'/api/users/{author.id}/')
+        return response.data['is_subscribed']
+
+    def test_follow_changed_outside_api(self):
+        author = self.create_user('author')
+        self.assertFalse(self.is_subscribed(author))
+        with self.captureOnCommitCallbacks(execute=True):
+            follow = Follow.objects.create(user=self.user, author=author)
+        self.assertTrue(self.is_subscribed(author))
+        with self.captureOnCommitCallbacks(execute=True):
+            follow.delete()
+        self.assertFalse(self.is_subscribed(author))
+
+
+class PopularRecipesCacheTest(FoodgramTestCase):
+    """Популярные рецепты отражают новые добавления в избранное."""
+
+    def popular_ids(self, client):
+        response = client.get('/api/recipes/?ordering=popular')
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_favorite_changes_popular_order(self):
+        author = self.create_user('author')
+        first = self.create_recipe(author, 0)
+        second = self.create_recipe(author, 1)
+        anonymous = APIClient()
+        self.assertEqual(self.popular_ids(anonymous), [second.id, first.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.user, recipe=first)
+        self.assertEqual(self.popular_ids(anonymous), [first.id, second.id])
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+    """locmem нельзя использовать с несколькими воркерами."""
+
+    def errors(self, **options):
+        with override_settings(**options):
+            return [error.id for error in shared_cache_check(None)]
+
+    def test_shared_cache_check(self):
+        self.assertEqual(
+            self.errors(CACHE_BACKEND='locmem', WEB_CONCURRENCY=2),
+            ['api.E001']
+        )
+        self.assertEqual(
+            self.errors(CACHE_BACKEND='locmem', WEB_CONCURRENCY=1), []
+        )
+        self.assertEqual(
+            self.errors(CACHE_BACKEND='redis', WEB_CONCURRENCY=4), []
+        )
+
+
+class SharedVersionTest(FoodgramTestCase):
+    """Изменение тегов в другом процессе сразу меняет ETag."""
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        self.environ = dict(
+            os.environ, CACHE_BACKEND='file', CACHE_LOCATION=location
+        )
+        cache_settings = override_settings(CACHES={'default': {
+            'BACKEND': settings.CACHE_BACKENDS['file'],
+            'LOCATION': location,
+        }})
+        cache_settings.enable()
+        self.addCleanup(cache_settings.disable)
+        super().setUp()
+
+    def test_tag_changed_in_other_process(self):
+        etag = self.client.get('/api/tags/')['ETag']
+        response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        subprocess.run(
+            [sys.executable, 'manage.py', 'shell', '-c',
+             'from api.cache import bump_version; bump_version("tags")'],
+            cwd=settings.BASE_DIR, env=self.environ, check=True,
+        )
+        response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
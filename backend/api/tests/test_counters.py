@@ -0,0 +1,45 @@
+from .utils import FoodgramTestCase
+from recipes.models import Favorite, Recipe
+from users.models import Follow, User
+
+
+class CountersSaveTest(FoodgramTestCase):
+    """Обычное сохранение объекта не затирает счетчики."""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.recipe = self.create_recipe(self.author, 0)
+
+    def test_user_save(self):
+        author = User.objects.get(pk=self.author.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(user=self.user, author=self.author)
+        author.set_password('New-pa55word-for-tests')
+        author.save()
+        author.refresh_from_db()
+        self.assertEqual(author.followers_count, 1)
+        self.assertEqual(author.recipes_count, 1)
+        self.assertTrue(author.check_password('New-pa55word-for-tests'))
+
+    def test_recipe_save(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.user, recipe=self.recipe)
+        recipe.name = 'Новое название'
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertEqual(recipe.name, 'Новое название')
+
+    def test_recipe_patch(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.user, recipe=self.recipe)
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.id}/',
+            {'name': 'Новое название'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
@@ -0,0 +1,56 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from .utils import FoodgramTestCase
+from recipes.models import Recipe
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeImageTest(FoodgramTestCase):
+    """В списках отдается миниатюра только текущего фото."""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe(self.user, 0)
+        Recipe.objects.filter(id=self.recipe.id).update(
+            image='recipes/images/old.jpg',
+            thumbnail='recipes/thumbnails/old.jpg',
+        )
+
+    def list_image(self):
+        response = APIClient().get('/api/recipes/')
+        return response.json()['results'][0]['image']
+
+    def test_replaced_image_without_thumbnail(self):
+        self.assertTrue(
+            self.list_image().endswith('recipes/thumbnails/old.jpg')
+        )
+        buffer = BytesIO()
+        Image.new('RGB', (8, 8), 'white').save(buffer, 'PNG')
+        with mock.patch('recipes.images.submit_recipe_image'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.patch(
+                    f'/api/recipes/{self.recipe.id}/',
+                    {'image': 'data:image/png;base64,'
+                              + base64.b64encode(buffer.getvalue()).decode()},
+                    format='json'
+                )
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertTrue(
+            self.list_image().endswith(self.recipe.image.name)
+        )
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+from django.test import override_settings
+
+from .utils import FoodgramTestCase
+from api.filters import IngredientSearchFilter
+from api.views import IngredientViewSet
+from recipes.models import Ingredient
+
+
+class IngredientSearchTest(FoodgramTestCase):
+    """Подсказки ингредиентов по началу названия и по вхождению."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for name in ('сахар', 'сахарная пудра', 'ванильный сахар', 'соль'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+    def search(self, name):
+        response = self.client.get('/api/ingredients/', {'name': name})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.json()]
+
+    def test_prefix_then_substring(self):
+        self.assertEqual(
+            self.search('Сах'), ['сахар', 'сахарная пудра', 'ванильный сахар']
+        )
+
+    def test_short_query_prefix_only(self):
+        self.assertEqual(self.search('са'), ['сахар', 'сахарная пудра'])
+
+    @override_settings(INGREDIENT_SEARCH_LIMIT=1)
+    def test_limit(self):
+        self.assertEqual(self.search('сахар'), ['сахар'])
+
+    def test_detail_with_search(self):
+        ingredient = Ingredient.objects.get(name='соль')
+        response = self.client.get(
+            f'/api/ingredients/{ingredient.id}/', {'name': 'со'}
+        )
+        self.assertEqual(response.json()['name'], 'соль')
+
+    def test_returns_queryset(self):
+        queryset = IngredientSearchFilter().filter_queryset(
+            SimpleNamespace(query_params={'name': 'сах'}),
+            Ingredient.objects.all(),
+            IngredientViewSet(action='list'),
+        )
+        self.assertEqual(
+            list(queryset.values_list('name', flat=True)),
+            ['сахар', 'сахарная пудра', 'ванильный сахар']
+        )
+        self.assertEqual(queryset.filter(name='соль').count(), 0)
+
+    @override_settings(INGREDIENT_AUTOCOMPLETE=False)
+    def test_database_fallback(self):
+        self.assertEqual(self.search('сах'), ['сахар', 'сахарная пудра'])
@@ -0,0 +1,67 @@
+import re
+from unittest import mock
+
+from django.test import override_settings
+
+from .utils import FoodgramTestCase
+from api import metrics
+
+
+class MetricsTest(FoodgramTestCase):
+    """Показатели запросов копятся в процессе и переносятся в кэш."""
+
+    def setUp(self):
+        super().setUp()
+        metrics._pending.clear()
+
+    def get_value(self, name, view, action):
+        match = re.search(
+            rf'foodgram_{name}{{view="{view}",action="{action}"}} (\S+)',
+            metrics.render_metrics()
+        )
+        return float(match.group(1)) if match else None
+
+    @override_settings(METRICS_FLUSH_INTERVAL=3600)
+    def test_requests_aggregated_in_process(self):
+        metrics.flush_metrics()
+        with mock.patch.object(metrics, 'cache') as cache:
+            for _ in range(3):
+                self.client.get('/api/recipes/')
+        cache.assert_not_called()
+        self.assertEqual(cache.method_calls, [])
+        self.assertEqual(
+            self.get_value('requests_total', 'RecipeViewSet', 'list'), 3
+        )
+
+    def test_labels_registered_once(self):
+        for view, action in (('A', 'list'), ('B', 'list'), ('A', 'list')):
+            metrics.register_label(view, action)
+        self.assertEqual(metrics.get_labels(), [('A', 'list'), ('B', 'list')])
+
+    def test_serialization_timing(self):
+        response = self.client.get('/api/tags/')
+        self.assertIn('serialization;dur=', response['Server-Timing'])
+        self.assertGreater(
+            self.get_value(
+                'serialization_duration_seconds_total', 'TagViewSet', 'list'
+            ),
+            0
+        )
+
+    def test_streamed_response_size(self):
+        recipe = self.create_recipe(self.create_user('author'), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/', {'format': 'csv'}
+        )
+        self.assertFalse(response.has_header('Content-Length'))
+        content = b''.join(response.streaming_content)
+        self.assertGreater(len(content), 0)
+        self.assertEqual(
+            self.get_value(
+                'response_bytes_total',
+                'RecipeViewSet', 'download_shopping_cart'
+            ),
+            len(content)
+        )
@@ -0,0 +1,71 @@
+from .utils import FoodgramTestCase
+from recipes.models import POPULAR_ORDERING, Recipe
+
+
+class KeysetPaginationTest(FoodgramTestCase):
+    """Постраничный вывод рецептов по составному курсору."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        author = cls.create_user('author')
+        for number in range(7):
+            Recipe.objects.create(
+                author=author,
+                name=f'Рецепт {number}',
+                text=f'Описание {number}',
+                cooking_time=10,
+                favorites_count=number % 2,
+            )
+
+    def walk(self, url, between_pages=None):
+        ids = []
+        while url:
+            data = self.client.get(url).data
+            ids.extend(recipe['id'] for recipe in data['results'])
+            if between_pages is not None:
+                between_pages(ids)
+            url = data['next']
+        return ids
+
+    def test_pages_follow_ordering(self):
+        for query, ordering in (
+            ('', ('-pub_date', '-id')),
+            ('&ordering=popular', POPULAR_ORDERING),
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    self.walk(f'/api/recipes/?cursor=&limit=2{query}'),
+                    list(Recipe.objects.order_by(
+                        *ordering
+                    ).values_list('id', flat=True))
+                )
+
+    def test_counter_changes_between_pages(self):
+        expected = list(
+            Recipe.objects.popular().values_list('id', flat=True)
+        )
+
+        def promote_seen(ids):
+            Recipe.objects.filter(pk=ids[-1]).update(favorites_count=100)
+
+        self.assertEqual(
+            self.walk(
+                '/api/recipes/?cursor=&limit=2&ordering=popular', promote_seen
+            ),
+            expected
+        )
+
+    def test_previous_page(self):
+        first = self.client.get('/api/recipes/?cursor=&limit=3').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual(back['results'], first['results'])
+
+    def test_cursor_with_search(self):
+        response = self.client.get('/api/recipes/?cursor=&search=рецепт')
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/recipes/?cursor=broken')
+        self.assertEqual(response.status_code, 404)
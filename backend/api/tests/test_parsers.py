@@ -0,0 +1,37 @@
+import json
+from urllib.parse import urlencode
+
+from django.test import override_settings
+
+from .utils import FoodgramTestCase
+
+
+class RecipeFormParserTest(FoodgramTestCase):
+    """Рецепт принимается и в application/x-www-form-urlencoded."""
+
+    content_type = 'application/x-www-form-urlencoded'
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe(self.user, 0)
+        self.url = f'/api/recipes/{self.recipe.id}/'
+
+    def patch(self, data):
+        return self.client.patch(
+            self.url, urlencode(data), content_type=self.content_type
+        )
+
+    def test_urlencoded_edit(self):
+        response = self.patch({
+            'name': 'Новое название',
+            'tags': json.dumps([self.tags[0].id]),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Новое название')
+        self.assertEqual(list(self.recipe.tags.all()), [self.tags[0]])
+
+    @override_settings(RECIPE_UPLOAD_MAX_BODY_SIZE=64)
+    def test_urlencoded_body_limit(self):
+        response = self.patch({'text': 'x' * 100})
+        self.assertEqual(response.status_code, 413)
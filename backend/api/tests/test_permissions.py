@@ -0,0 +1,70 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from .utils import FoodgramTestCase
+from api.permissions import IsAuthorOrAdminOrReadOnly
+from recipes.models import Recipe
+from users.models import UserRole
+
+
+class RecipePermissionTest(FoodgramTestCase):
+    """Проверка прав на рецепт не обращается к базе."""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.admin = self.create_user('admin')
+        self.admin.role = UserRole.ADMIN
+        self.admin.save()
+        self.recipe = self.create_recipe(self.author, 0)
+        self.url = f'/api/recipes/{self.recipe.id}/'
+
+    def test_has_object_permission(self):
+        recipe = Recipe.objects.only('id', 'author_id').get(
+            id=self.recipe.id
+        )
+        for user, allowed in (
+            (self.author, True), (self.user, False), (self.admin, True)
+        ):
+            with self.subTest(user=user.username):
+                request = APIRequestFactory().patch(self.url)
+                request.user = user
+                with CaptureQueriesContext(connection) as context:
+                    result = IsAuthorOrAdminOrReadOnly().has_object_permission(
+                        request, None, recipe
+                    )
+                self.assertEqual(result, allowed)
+                self.assertEqual(context.captured_queries, [])
+
+    def assert_forbidden(self, method, queries, columns):
+        """
+        Запрос не автора отклоняется с 403: рецепт загружается одним
+        запросом и только с полями columns.
+        """
+        with self.assertNumQueries(queries):
+            with CaptureQueriesContext(connection) as context:
+                response = getattr(self.client, method)(
+                    self.url, {'name': 'Чужой рецепт'}, format='json'
+                )
+        self.assertEqual(response.status_code, 403)
+        loads = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "recipes_recipe"' in query['sql']
+        ]
+        self.assertEqual(len(loads), 1)
+        selected = loads[0].split(' FROM ')[0]
+        self.assertEqual(selected.count('"recipes_recipe".'), len(columns))
+        for column in columns:
+            self.assertIn(f'"recipes_recipe"."{column}"', selected)
+
+    def test_patch_by_non_author(self):
+        self.assert_forbidden('patch', 1, (
+            'id', 'author_id', 'name', 'text', 'cooking_time',
+            'image', 'thumbnail', 'tags_mask',
+        ))
+
+    def test_delete_by_non_author(self):
+        self.assert_forbidden('delete', 1, ('id', 'author_id'))
+        self.assertTrue(Recipe.objects.filter(id=self.recipe.id).exists())
@@ -0,0 +1,67 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .utils import FoodgramTestCase
+from recipes.models import Recipe
+from users.models import Follow
+
+
+class ConstantQueriesTest(FoodgramTestCase):
+    """Число запросов к базе не зависит от размера страницы."""
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def create_authors(self, count):
+        for number in range(count):
+            author = self.create_user(f'author{count}-{number}')
+            for recipe_number in range(2):
+                self.create_recipe(author, recipe_number)
+            Follow.objects.create(user=self.user, author=author)
+
+    def assert_constant_queries(self, url):
+        self.create_authors(1)
+        queries = self.count_queries(url)
+        self.create_authors(4)
+        with self.assertNumQueries(queries):
+            self.client.get(url)
+
+    def test_recipes_list(self):
+        self.assert_constant_queries('/api/recipes/')
+
+    def test_recipes_list_cursor(self):
+        self.assert_constant_queries('/api/recipes/?cursor=')
+
+    def test_subscriptions(self):
+        self.assert_constant_queries('/api/users/subscriptions/')
+
+    def test_subscriptions_recipes_limit(self):
+        self.assert_constant_queries(
+            '/api/users/subscriptions/?recipes_limit=1'
+        )
+
+
+class EmptySubscriptionsTest(FoodgramTestCase):
+    """Подписки пользователя без подписок и пустые страницы."""
+
+    def test_no_subscriptions(self):
+        for url in (
+            '/api/users/subscriptions/',
+            '/api/users/subscriptions/?recipes_limit=1',
+            '/api/users/subscriptions/?recipes_limit=1&cursor=',
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data['results'], [])
+
+    def test_latest_per_author_empty(self):
+        self.assertEqual(
+            list(Recipe.objects.filter(
+                author__in=[]
+            ).latest_per_author(1)),
+            []
+        )
@@ -0,0 +1,95 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .utils import FoodgramTestCase
+from recipes.models import Tag
+
+
+class RecipeUpdateQueriesTest(FoodgramTestCase):
+    """Редактирование рецепта сохраняет только изменившиеся данные."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe(self.user, 0)
+        self.url = f'/api/recipes/{self.recipe.id}/'
+        self.data = {
+            'name': self.recipe.name,
+            'text': self.recipe.text,
+            'cooking_time': self.recipe.cooking_time,
+            'tags': [tag.id for tag in self.tags],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 5}
+                for ingredient in self.ingredients
+            ],
+        }
+        self.patch(self.data)
+
+    def patch(self, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assert_update(self, data, queries, recipe_update):
+        """
+        Проверяет число запросов редактирования и запрос UPDATE
+        таблицы рецептов (None — рецепт не сохраняется).
+        """
+        with self.assertNumQueries(queries):
+            with CaptureQueriesContext(connection) as context:
+                self.patch(data)
+        updates = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "recipes_recipe"')
+        ]
+        if recipe_update is None:
+            self.assertEqual(updates, [])
+        else:
+            self.assertEqual(len(updates), 1)
+            self.assertTrue(updates[0].startswith(
+                f'UPDATE "recipes_recipe" SET {recipe_update} WHERE'
+            ))
+
+    def test_noop_edit(self):
+        self.assert_update(self.data, 13, None)
+
+    def test_partial_edit(self):
+        self.assert_update(
+            {'name': 'Новое название'}, 9,
+            '"name" = \'Новое название\''
+        )
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Новое название')
+
+    def test_full_edit(self):
+        self.assert_update(
+            {
+                'name': 'Новое название',
+                'text': 'Новое описание',
+                'cooking_time': 20,
+                'tags': [self.tags[0].id],
+                'ingredients': [{'id': self.ingredients[0].id, 'amount': 7}],
+            },
+            19,
+            '"name" = \'Новое название\', "text" = \'Новое описание\', '
+            '"cooking_time" = 20, '
+            f'"tags_mask" = {Tag.get_mask([self.tags[0]])}'
+        )
+        self.assertEqual(list(self.recipe.tags.all()), [self.tags[0]])
+        self.assertEqual(
+            list(self.recipe.ingridients_recipe.values_list('amount')),
+            [(7,)]
+        )
+
+    def test_ingredients_edit_resets_cache(self):
+        anonymous = APIClient()
+        anonymous.get(self.url)
+        self.patch({'ingredients': [
+            {'id': ingredient.id, 'amount': 6}
+            for ingredient in self.ingredients
+        ]})
+        response = anonymous.get(self.url)
+        self.assertEqual(
+            {item['amount'] for item in response.json()['ingredients']}, {6}
+        )
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+from concurrent import futures
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from .utils import FoodgramTestCase
+from api import utils
+from api.views import RecipeViewSet
+
+
+class ShoppingListPdfTest(FoodgramTestCase):
+    """Отрисовка pdf списка покупок и ее ошибки."""
+
+    url = '/api/recipes/download_shopping_cart/'
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        recipe = self.create_recipe(self.create_user('author'), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        executor = futures.ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        patcher = mock.patch.object(
+            utils, 'get_executor', return_value=executor
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sync_pdf(self):
+        with mock.patch.object(utils, 'render_pdf', return_value=b'%PDF'):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'%PDF')
+
+    def test_sync_render_error(self):
+        with mock.patch.object(
+            utils, 'render_pdf', side_effect=RuntimeError('pango')
+        ):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'failed')
+        self.assertEqual(
+            response.data['errors'], settings.SHOPPING_LIST_JOB_FAILED_ERROR
+        )
+        job_url = f'{self.url}{response.data["job_id"]}/'
+        self.assertEqual(self.client.get(job_url).data['status'], 'failed')
+
+    def test_job_pending_in_other_process(self):
+        key = utils.get_shopping_list_key(list(
+            RecipeViewSet.get_shopping_list(self.user)
+        ))
+        cache.set(utils.SHOPPING_LIST_PENDING_KEY.format(key=key), True)
+        with mock.patch.object(utils, 'submit_render') as submit:
+            response = self.client.get(f'{self.url}{key}/')
+            self.assertEqual(response.status_code, 202)
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(response.data['job_id'], key)
+        submit.assert_not_called()
+
+
+class ShoppingListPoolTest(SimpleTestCase):
+    """Сломанный пул процессов пересоздается."""
+
+    def test_broken_pool_is_replaced(self):
+        self.addCleanup(utils.reset_executor)
+        executor = utils.get_executor()
+        with self.assertRaises(BrokenProcessPool):
+            executor.submit(os._exit, 1).result(timeout=30)
+        future = utils.submit_render('<p>Список покупок</p>')
+        self.assertIsNotNone(future.result(timeout=30))
+        self.assertIsNot(utils.get_executor(), executor)
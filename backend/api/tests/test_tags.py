@@ -0,0 +1,31 @@
+from django.core.exceptions import ValidationError
+from django.test import override_settings
+
+from .utils import FoodgramTestCase
+from recipes.models import Tag
+
+
+@override_settings(MAX_TAGS=2)
+class TagsLimitTest(FoodgramTestCase):
+    """Превышение лимита тегов - ошибка формы или 400, а не 500."""
+
+    def test_model_clean(self):
+        tag = Tag(name='Лишний', slug='extra', color='#0000ff')
+        with self.assertRaises(ValidationError):
+            tag.full_clean()
+        self.tags[0].full_clean()
+
+    def test_api_create(self):
+        response = self.client.post(
+            '/api/tags/',
+            {'name': 'Лишний', 'slug': 'extra', 'color': '#0000ff'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Tag.objects.filter(slug='extra').exists())
+
+    def test_api_update(self):
+        response = self.client.patch(
+            f'/api/tags/{self.tags[0].id}/', {'name': 'Новый'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,54 @@
+from django.core.cache import cache
+from rest_framework.test import APIClient, APITestCase
+
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from users.models import User
+
+
+class FoodgramTestCase(APITestCase):
+    """Общие данные и вспомогательные методы тестов API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.create_user('viewer')
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тег {number}', slug=f'tag-{number}', color='#00ff00'
+            )
+            for number in range(2)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @staticmethod
+    def create_user(username):
+        return User.objects.create_user(
+            username=username,
+            email=f'{username}@example.com',
+            password='Pa55word-for-tests',
+            first_name=username,
+            last_name=username,
+        )
+
+    def create_recipe(self, author, number):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=f'Рецепт {author.username} {number}',
+            text=f'Описание {author.username} {number}',
+            cooking_time=10,
+        )
+        recipe.tags.set(self.tags)
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=recipe, ingredient=ingredient, amount=5)
+            for ingredient in self.ingredients
+        )
+        return recipe
@@ -1,21 +1,255 @@
-from django.http import HttpResponse
+import csv
+import hashlib
+import json
+from concurrent import futures
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from threading import RLock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.template.loader import render_to_string
+from rest_framework.exceptions import ValidationError
 from weasyprint import HTML
 
+SHOPPING_LIST_FORMATS = {
+    'pdf': 'application/pdf',
+    'txt': 'text/plain',
+    'csv': 'text/csv',
+    'json': 'application/json',
+}
+
+SHOPPING_LIST_FAILED_KEY = 'shopping-list-failed:{key}'
+SHOPPING_LIST_PENDING_KEY = 'shopping-list-pending:{key}'
+
+_executor = None
+_pending = {}
+_lock = RLock()
+
+
+def render_pdf(html_template):
+    """Преобразует html в pdf. Выполняется в процессе пула."""
+    return HTML(string=html_template).write_pdf()
+
+
+def get_executor():
+    """Создает пул процессов для отрисовки pdf при первом обращении."""
+    global _executor
+    if _executor is None:
+        _executor = futures.ProcessPoolExecutor(
+            max_workers=settings.SHOPPING_LIST_WORKERS
+        )
+    return _executor
+
+
+def reset_executor():
+    """
+    Заменяет сломанный пул: после гибели процесса пула (нехватка
+    памяти, падение pango) ProcessPoolExecutor больше не принимает задачи.
+    """
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = None
+
+
+def submit_render(html_template):
+    """Ставит отрисовку в пул, пересоздавая пул, если он сломан."""
+    try:
+        return get_executor().submit(render_pdf, html_template)
+    except BrokenProcessPool:
+        reset_executor()
+        return get_executor().submit(render_pdf, html_template)
+
 
-def download_shopping_cart_response(shopping_list):
+def get_shopping_list_key(shopping_list):
+    """Вычисляет ключ списка покупок по его содержимому."""
+    content = json.dumps(shopping_list, ensure_ascii=False, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def get_shopping_list_path(key):
+    """Путь к готовому pdf в хранилище файлов."""
+    return f'{settings.SHOPPING_LIST_DIR}/{key}.pdf'
+
+
+def store_shopping_list(key, future):
+    """
+    Сохраняет отрисованный pdf и снимает задачу из очереди.
+    Ошибка отрисовки запоминается на SHOPPING_LIST_FAILED_TIMEOUT
+    секунд, а повторный запрос ставит задачу заново. Отметка
+    об очереди снимается последней, чтобы опрос из другого процесса
+    не застал задачу без состояния.
+    """
+    with _lock:
+        if future.exception() is None:
+            path = get_shopping_list_path(key)
+            if not default_storage.exists(path):
+                default_storage.save(path, ContentFile(future.result()))
+        else:
+            cache.set(
+                SHOPPING_LIST_FAILED_KEY.format(key=key), True,
+                settings.SHOPPING_LIST_FAILED_TIMEOUT
+            )
+        _pending.pop(key, None)
+        cache.delete(SHOPPING_LIST_PENDING_KEY.format(key=key))
+
+
+def submit_shopping_list(key, shopping_list):
+    """
+    Ставит отрисовку списка покупок в пул процессов.
+    Повторная постановка того же списка возвращает уже запущенную задачу.
+    Очередь отмечается в общем кэше, поэтому список, который уже рисует
+    другой процесс, заново не ставится: тогда возвращается None.
     """
-    Скачивает список ингредиентов из продуктовой корзины в формате .txt.
-    Пользователь получает файл с необходимыми ингредиентами для всех
-    добавленных в продуктовую корзину рецептов.
+    with _lock:
+        future = _pending.get(key)
+        if future is not None:
+            return future
+        if not cache.add(
+            SHOPPING_LIST_PENDING_KEY.format(key=key), True,
+            settings.SHOPPING_LIST_PENDING_TIMEOUT
+        ):
+            return None
+        html_template = render_to_string(
+            'recipes/pdf_template.html',
+            {'ingredients': shopping_list}
+        )
+        cache.delete(SHOPPING_LIST_FAILED_KEY.format(key=key))
+        future = submit_render(html_template)
+        _pending[key] = future
+        future.add_done_callback(partial(store_shopping_list, key))
+        return future
+
+
+def get_shopping_list_status(key):
     """
-    html_template = render_to_string(
-        'recipes/pdf_template.html',
-        {'ingredients': shopping_list}
+    Возвращает состояние задачи: 'done', 'pending', 'failed'
+    либо None, если задача неизвестна ни одному процессу.
+    """
+    if default_storage.exists(get_shopping_list_path(key)):
+        return 'done'
+    if cache.get(SHOPPING_LIST_PENDING_KEY.format(key=key)):
+        return 'pending'
+    if cache.get(SHOPPING_LIST_FAILED_KEY.format(key=key)):
+        return 'failed'
+    return None
+
+
+def shopping_list_file_response(key):
+    """Отдает готовый pdf из хранилища файлов."""
+    return FileResponse(
+        default_storage.open(get_shopping_list_path(key)),
+        filename='shopping_list.pdf',
+        content_type='application/pdf',
     )
-    html = HTML(string=html_template)
-    result = html.write_pdf()
+
+
+def pdf_response(result):
+    """Формирует ответ с pdf-файлом списка покупок."""
     response = HttpResponse(result, content_type='application/pdf;')
     response['Content-Disposition'] = 'inline; filename=shopping_list.pdf'
     response['Content-Transfer-Encoding'] = 'binary'
     return response
+
+
+def wait_shopping_list(future):
+    """
+    Ждет отрисовку pdf не дольше SHOPPING_LIST_WAIT_TIMEOUT секунд.
+    Возвращает состояние задачи: 'done', 'failed' при ошибке отрисовки
+    или 'pending', если отрисовка не успела и запрос нужно перевести
+    в режим задачи.
+    """
+    try:
+        error = future.exception(timeout=settings.SHOPPING_LIST_WAIT_TIMEOUT)
+    except futures.TimeoutError:
+        return 'pending'
+    return 'done' if error is None else 'failed'
+
+
+def get_shopping_list_format(request):
+    """
+    Определяет формат списка покупок по параметру format,
+    а без него - по заголовку Accept. По умолчанию - pdf.
+    """
+    shopping_list_format = request.query_params.get('format')
+    if shopping_list_format is not None:
+        if shopping_list_format not in SHOPPING_LIST_FORMATS:
+            raise ValidationError({
+                'format': settings.SHOPPING_LIST_FORMAT_ERROR
+            })
+        return shopping_list_format
+    media_types = [
+        media_type.split(';')[0].strip()
+        for media_type in request.META.get('HTTP_ACCEPT', '').split(',')
+    ]
+    for media_type in media_types:
+        for shopping_list_format, content_type in (
+            SHOPPING_LIST_FORMATS.items()
+        ):
+            if media_type == content_type:
+                return shopping_list_format
+    return 'pdf'
+
+
+class Echo:
+    """Файлоподобный объект, возвращающий записанную строку."""
+    def write(self, value):
+        return value
+
+
+def shopping_list_txt(shopping_list):
+    """Построчно формирует список покупок в формате .txt."""
+    yield 'Список покупок\n\n'
+    for name, amount, measurement_unit in shopping_list:
+        yield f'{name} - {amount} {measurement_unit}\n'
+
+
+def shopping_list_csv(shopping_list):
+    """Построчно формирует список покупок в формате .csv."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for row in shopping_list:
+        yield writer.writerow(row)
+
+
+def shopping_list_json(shopping_list):
+    """Поэлементно формирует список покупок в формате .json."""
+    separator = ''
+    yield '['
+    for name, amount, measurement_unit in shopping_list:
+        yield separator + json.dumps({
+            'name': name,
+            'amount': amount,
+            'measurement_unit': measurement_unit,
+        }, ensure_ascii=False)
+        separator = ', '
+    yield ']'
+
+
+SHOPPING_LIST_WRITERS = {
+    'txt': shopping_list_txt,
+    'csv': shopping_list_csv,
+    'json': shopping_list_json,
+}
+
+
+def stream_shopping_list_response(shopping_list, shopping_list_format):
+    """
+    Отдает список покупок в текстовом формате по мере чтения строк
+    из базы, не собирая весь список в памяти.
+    """
+    response = StreamingHttpResponse(
+        SHOPPING_LIST_WRITERS[shopping_list_format](shopping_list),
+        content_type=(
+            f'{SHOPPING_LIST_FORMATS[shopping_list_format]}; charset=utf-8'
+        ),
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename=shopping_list.{shopping_list_format}'
+    )
+    return response
@@ -1,28 +1,41 @@
-from django.db.models import F, Sum
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import (SAFE_METHODS, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
 from .filters import IngredientSearchFilter, RecipeFilterSet
+from .metrics import render_metrics
+from .mixins import ConditionalCacheMixin, SerializationTimingMixin
+from .negotiation import IgnoreClientContentNegotiation
 from .pagination import CustomPagination
-from .permissions import IsAuthorOrAdminOrReadOnly
+from .parsers import (LimitedFormParser, LimitedJSONParser,
+                      LimitedMultiPartParser)
+from .permissions import IsAdmin, IsAuthorOrAdminOrReadOnly
 from .serializers import (CartSerializer, CreateRecipeSerializer,
                           FavoriteSerializer, FollowListSerializer,
                           FollowSerializer, IngredientSerializer,
                           RecipeSerializer, TagSerializer)
-from .utils import download_shopping_cart_response
-from recipes.models import (Cart, Favorite, Ingredient, IngredientRecipe,
+from .utils import (get_shopping_list_format, get_shopping_list_key,
+                    get_shopping_list_status, pdf_response,
+                    shopping_list_file_response, stream_shopping_list_response,
+                    submit_shopping_list, wait_shopping_list)
+from recipes.models import (POPULAR_ORDERING, Cart, Favorite, Ingredient,
                             Recipe, Tag)
 from users.models import Follow, User
 
 
-class UsersViewSet(UserViewSet):
+class UsersViewSet(SerializationTimingMixin, UserViewSet):
     """Viewset для пользователей и подписок."""
     pagination_class = CustomPagination
 
@@ -32,16 +45,46 @@ class UsersViewSet(UserViewSet):
         self.get_object = self.get_instance
         return self.retrieve(request, *args, **kwargs)
 
+    def get_recipes_limit(self):
+        """Проверяет ограничение количества рецептов автора в выдаче."""
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if not recipes_limit:
+            return None
+        try:
+            recipes_limit = int(recipes_limit)
+        except ValueError:
+            recipes_limit = -1
+        if recipes_limit < 0:
+            raise ValidationError({
+                'recipes_limit': settings.RECIPES_LIMIT_ERROR
+            })
+        return recipes_limit
+
+    @staticmethod
+    def attach_recipes_preview(authors, recipes_limit):
+        """Загружает рецепты всех авторов страницы одним запросом."""
+        if not authors:
+            return
+        recipes = Recipe.objects.filter(author__in=authors)
+        if recipes_limit is not None:
+            recipes = recipes.latest_per_author(recipes_limit)
+        recipes_by_author = defaultdict(list)
+        for recipe in recipes:
+            recipes_by_author[recipe.author_id].append(recipe)
+        for author in authors:
+            author.recipes_preview = recipes_by_author[author.id]
+
     @action(methods=['get'], detail=False)
     def subscriptions(self, request):
         """Получает список авторов, на которых подписан пользователь."""
+        recipes_limit = self.get_recipes_limit()
         subscriptions_list = self.paginate_queryset(
-            User.objects.filter(following__user=request.user)
+            User.objects.filter(following__user=request.user).order_by('id')
         )
-        serializer = FollowListSerializer(
-            subscriptions_list, many=True, context={
-                'request': request
-            }
+        self.attach_recipes_preview(subscriptions_list, recipes_limit)
+        serializer = self.get_action_serializer(
+            FollowListSerializer, subscriptions_list, many=True,
+            context={'recipes_limit': recipes_limit}
         )
         return self.get_paginated_response(serializer.data)
 
@@ -56,26 +99,74 @@ class UsersViewSet(UserViewSet):
             )
             self.perform_destroy(subscription)
             return Response(status=status.HTTP_204_NO_CONTENT)
-        serializer = FollowSerializer(
+        serializer = self.get_action_serializer(
+            FollowSerializer,
             data={
                 'user': request.user.id,
                 'author': get_object_or_404(User, id=id).id
             },
-            context={'request': request}
+            context={'recipes_limit': self.get_recipes_limit()}
         )
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(
+    SerializationTimingMixin, ConditionalCacheMixin, ModelViewSet
+):
     """Viewset для рецептов, продуктовой корзины и избранного."""
+    cache_version_name = 'recipes'
+    cache_anonymous_only = True
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     pagination_class = CustomPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilterSet
     permission_classes = (IsAuthorOrAdminOrReadOnly, IsAuthenticatedOrReadOnly)
+    parser_classes = (
+        LimitedJSONParser, LimitedMultiPartParser, LimitedFormParser
+    )
+    update_fields = (
+        'id', 'author_id', 'name', 'text', 'cooking_time',
+        'image', 'thumbnail', 'tags_mask',
+    )
+
+    @property
+    def cursor_ordering(self):
+        """
+        Порядок страниц по курсору, для ordering=popular - по счетчикам.
+        Порядок по релевантности поиска не хранится в таблице, поэтому
+        курсор вместе с search не поддерживается.
+        """
+        if self.request.query_params.get('search'):
+            return None
+        if self.request.query_params.get('ordering') == 'popular':
+            return POPULAR_ORDERING
+        return ('-pub_date', '-id')
+
+    def is_cacheable(self, request):
+        """
+        Популярные рецепты не кэшируются: счетчики избранного и корзин
+        меняются слишком часто, чтобы сбрасывать из-за них весь кэш.
+        """
+        return request.query_params.get('ordering') != 'popular'
+
+    def get_queryset(self):
+        """
+        Для чтения загружает связанные с рецептами объекты и признаки
+        избранного и продуктовой корзины текущего пользователя.
+        Для изменения и удаления - только поля, нужные для проверки
+        прав и сохранения рецепта.
+        """
+        queryset = super().get_queryset()
+        if self.action == 'destroy':
+            return queryset.only('id', 'author_id')
+        if self.action in ('update', 'partial_update'):
+            return queryset.only(*self.update_fields)
+        if self.request.method in SAFE_METHODS:
+            queryset = queryset.with_read_graph()
+        return queryset.with_user_flags(self.request.user)
 
     def get_serializer_class(self):
         """Проверяет тип запроса и определяет класс сериализатора."""
@@ -83,11 +174,10 @@ class RecipeViewSet(ModelViewSet):
             return RecipeSerializer
         return CreateRecipeSerializer
 
-    @staticmethod
-    def post_method_for_actions(request, pk, serializers):
+    def post_method_for_actions(self, request, pk, serializers):
         """Действия для POST-запросов."""
         data = {'user': request.user.id, 'recipe': pk}
-        serializer = serializers(data=data, context={'request': request})
+        serializer = self.get_action_serializer(serializers, data=data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -115,24 +205,92 @@ class RecipeViewSet(ModelViewSet):
             request=request, pk=pk, model=Cart
         )
 
+    @staticmethod
+    def get_shopping_list(user):
+        """Получает список покупок пользователя."""
+        return user.shopping_list.values_list(
+            'ingredient__name',
+            'amount',
+            'ingredient__measurement_unit'
+        ).order_by('ingredient__name')
+
+    def shopping_list_job_response(self, key, job_status):
+        """
+        Сообщает состояние задачи отрисовки списка покупок:
+        поставлен в очередь (202) или не удалось отрисовать (200
+        со status failed: это итог задачи, а не сбой запроса).
+        """
+        if job_status == 'failed':
+            return Response({
+                'job_id': key,
+                'status': 'failed',
+                'errors': settings.SHOPPING_LIST_JOB_FAILED_ERROR,
+            })
+        response = Response(
+            {'job_id': key, 'status': 'pending'},
+            status=status.HTTP_202_ACCEPTED
+        )
+        response['Location'] = self.reverse_action(
+            'download-shopping-cart-job', args=(key,)
+        )
+        return response
+
     @action(
         detail=False,
         methods=['get'],
-        permission_classes=(IsAuthenticated,)
+        permission_classes=(IsAuthenticated,),
+        content_negotiation_class=IgnoreClientContentNegotiation,
     )
     def download_shopping_cart(self, request):
-        """Загружает списка ингредиентов из продуктовой корзины через Utils."""
-        shopping_list = IngredientRecipe.objects.filter(
-            recipe__cart__user=request.user
-        ).values(
-            name=F('ingredient__name'),
-            measurement_unit=F('ingredient__measurement_unit')
-        ).annotate(amount=Sum('amount')).values_list(
-            'ingredient__name',
-            'amount',
-            'ingredient__measurement_unit'
-        )
-        return download_shopping_cart_response(shopping_list)
+        """
+        Загружает списка ингредиентов из продуктовой корзины через Utils.
+        Формат задается параметром format (pdf, txt, csv, json)
+        или заголовком Accept. Текстовые форматы отдаются потоком.
+        Pdf по умолчанию отдается в том же ответе, потому что фронтенд
+        скачивает его обычной ссылкой, но ожидание отрисовки ограничено
+        SHOPPING_LIST_WAIT_TIMEOUT: не успевший список, как и запрос
+        с параметром async=1 или список, который уже рисует другой
+        процесс, получает 202 с id задачи.
+        """
+        shopping_list_format = get_shopping_list_format(request)
+        shopping_list = self.get_shopping_list(request.user)
+        if shopping_list_format != 'pdf':
+            return stream_shopping_list_response(
+                shopping_list.iterator(), shopping_list_format
+            )
+        shopping_list = list(shopping_list)
+        key = get_shopping_list_key(shopping_list)
+        if get_shopping_list_status(key) == 'done':
+            return shopping_list_file_response(key)
+        future = submit_shopping_list(key, shopping_list)
+        job_status = 'pending'
+        if future is not None and not request.query_params.get('async'):
+            job_status = wait_shopping_list(future)
+        if job_status == 'done':
+            return pdf_response(future.result())
+        return self.shopping_list_job_response(key, job_status)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=(IsAuthenticated,),
+        url_path=r'download_shopping_cart/(?P<job_id>[0-9a-f]{64})',
+    )
+    def download_shopping_cart_job(self, request, job_id):
+        """Отдает отрисованный список покупок или состояние задачи."""
+        job_status = get_shopping_list_status(job_id)
+        if job_status == 'done':
+            return shopping_list_file_response(job_id)
+        if job_status is None:
+            shopping_list = list(self.get_shopping_list(request.user))
+            if get_shopping_list_key(shopping_list) != job_id:
+                return Response(
+                    {'errors': settings.SHOPPING_LIST_JOB_NOT_FOUND_ERROR},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            submit_shopping_list(job_id, shopping_list)
+            job_status = 'pending'
+        return self.shopping_list_job_response(job_id, job_status)
 
     @action(detail=True, methods=['post'])
     def favorite(self, request, pk):
@@ -147,15 +305,32 @@ class RecipeViewSet(ModelViewSet):
             request=request, pk=pk, model=Favorite)
 
 
-class IngredientViewSet(ModelViewSet):
+class IngredientViewSet(
+    SerializationTimingMixin, ConditionalCacheMixin, ModelViewSet
+):
     """Viewset для игредиентов."""
+    cache_version_name = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (IngredientSearchFilter,)
     search_fields = ('^name',)
 
 
-class TagViewSet(ModelViewSet):
+class TagViewSet(
+    SerializationTimingMixin, ConditionalCacheMixin, ModelViewSet
+):
     """Viewset для тэгов."""
+    cache_version_name = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+
+
+class MetricsView(APIView):
+    """Показатели запросов в текстовом формате Prometheus."""
+    permission_classes = (IsAdmin,)
+
+    def get(self, request):
+        return HttpResponse(
+            render_metrics(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
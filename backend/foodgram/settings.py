@@ -33,6 +33,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.RequestMetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -66,6 +67,28 @@ DATABASES = {
     }
 }
 
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+
+# Версии данных, ответы с ETag, метки очереди pdf и общий кэш токенов
+# хранятся в кэше по умолчанию. locmem виден только своему процессу,
+# поэтому годится лишь для одного процесса (разработка, тесты): при
+# нескольких воркерах gunicorn (WEB_CONCURRENCY > 1) нужен общий кэш,
+# например redis, как в infra/docker-compose.yml. Проверка api.E001
+# не дает запустить locmem с несколькими воркерами.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -105,7 +128,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 }
 
@@ -123,6 +146,47 @@ DJOSER = {
 
 COUNT_RECIPES_IN_PAGE = 6
 
+FOLLOWING_CACHE_TIMEOUT = int(os.getenv('FOLLOWING_CACHE_TIMEOUT', 0))
+
+TOKEN_CACHE_SIZE = 1024
+TOKEN_CACHE_LOCAL_TIMEOUT = 10
+TOKEN_CACHE_TIMEOUT = 300
+TOKEN_CACHE_SHARED = os.getenv('TOKEN_CACHE_SHARED', 'False') == 'True'
+
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+
+INGREDIENT_AUTOCOMPLETE = True
+INGREDIENT_INDEX_TIMEOUT = 300
+INGREDIENT_SEARCH_LIMIT = 20
+INGREDIENT_SUBSTRING_MIN_LENGTH = 3
+
+SHOPPING_LIST_DIR = 'shopping_lists'
+SHOPPING_LIST_WORKERS = int(os.getenv('SHOPPING_LIST_WORKERS', 2))
+SHOPPING_LIST_WAIT_TIMEOUT = 10
+SHOPPING_LIST_FAILED_TIMEOUT = 60
+SHOPPING_LIST_PENDING_TIMEOUT = 5 * 60
+SHOPPING_LIST_TIMEOUT = 24 * 60 * 60
+
+RECIPE_IMAGE_FORMAT = 'WEBP'
+RECIPE_IMAGE_QUALITY = 80
+RECIPE_IMAGE_MAX_SIZE = (1280, 1280)
+RECIPE_THUMBNAIL_SIZE = (480, 480)
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', 2))
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+RECIPE_IMAGE_SPOOL_SIZE = 1024 * 1024
+RECIPE_UPLOAD_MAX_BODY_SIZE = 15 * 1024 * 1024
+
+RECIPE_SEARCH_CONFIG = 'russian'
+
+MAX_TAGS = 63
+
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', 1))
+METRICS_SERVER_TIMING = True
+METRICS_DUPLICATE_QUERY_THRESHOLD = 5
+METRICS_FLUSH_INTERVAL = 10
+
 MAX_LENGTH = 254
 
 MIN_COOKING_TIME = 0
@@ -136,6 +200,14 @@ MIN_AMOUNT_INGREDIENT_ERROR = 'Минимальное количество иг
 
 ADD_INGREDIENTS_IN_RECIPES_ERROR = 'Данный ингредиент уже есть в рецепте'
 
+INGREDIENTS_NOT_FOUND_ERROR = 'Ингредиенты не найдены: {ids}'
+
+ADD_TAGS_IN_RECIPES_ERROR = 'Данный тег уже есть в рецепте'
+
+TAGS_NOT_FOUND_ERROR = 'Теги не найдены: {ids}'
+
+TAGS_LIMIT_ERROR = 'Нельзя создать больше 63 тегов'
+
 ADD_RECIPES_IN_FAVORITE_ERROR = 'Данный рецепт уже добавлен в избранное'
 
 ADD_RECIPES_IN_SHOPPING_CART_ERROR = 'Данный рецепт уже добавлен в корзину'
@@ -143,3 +215,21 @@ ADD_RECIPES_IN_SHOPPING_CART_ERROR = 'Данный рецепт уже доба
 USER_FOLLOWING_HIMSELF_ERROR = 'Вы не можете пописаться на себя'
 
 USER_FOLLOWING_FOLLOWER_ERROR = 'Вы уже подписаны на этого автора'
+
+SHOPPING_LIST_JOB_NOT_FOUND_ERROR = 'Список покупок изменился, запросите его заново'
+
+SHOPPING_LIST_JOB_FAILED_ERROR = 'Не удалось сформировать список покупок'
+
+SHOPPING_LIST_FORMAT_ERROR = 'Доступные форматы: pdf, txt, csv, json'
+
+CURSOR_ORDERING_ERROR = 'Постраничный вывод по курсору недоступен вместе с поиском'
+
+RECIPES_LIMIT_ERROR = 'recipes_limit должен быть неотрицательным целым числом'
+
+IMAGE_INVALID_ERROR = 'Загрузите картинку в формате jpeg, png, gif или webp'
+
+IMAGE_TOO_LARGE_ERROR = 'Размер картинки не должен превышать 10 МБ'
+
+REQUEST_TOO_LARGE_ERROR = 'Слишком большой запрос'
+
+MULTIPART_JSON_ERROR = 'Ожидается JSON-массив'
@@ -1,11 +1,14 @@
 from django.contrib import admin
 
-from .models import Cart, Favorite, Ingredient, IngredientRecipe, Recipe, Tag
+from .admin_tools import AutocompleteFilter, LargeTableAdmin
+from .models import (Cart, CartIngredient, Favorite, Ingredient,
+                     IngredientRecipe, Recipe, Tag)
 
 
 class IngredientRecipeInline(admin.TabularInline):
     model = IngredientRecipe
     extra = 0
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(Tag)
@@ -22,7 +25,7 @@ class TagAdmin(admin.ModelAdmin):
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(LargeTableAdmin):
     """Управление ингредиентами через админ панель."""
     list_display = (
         'name',
@@ -30,11 +33,11 @@ class IngredientAdmin(admin.ModelAdmin):
     )
     list_display_links = ('name',)
     search_fields = ('name',)
-    list_filter = ('name',)
+    list_filter = ('measurement_unit',)
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdmin):
     """Управление рецептами через админ панель."""
     list_display = (
         'name',
@@ -43,40 +46,74 @@ class RecipeAdmin(admin.ModelAdmin):
     )
     list_display_links = ('name',)
     search_fields = ('name',)
-    list_filter = ('author', 'name', 'tags')
-    readonly_fields = ('in_favorite',)
+    list_filter = (('author', AutocompleteFilter), 'tags')
+    list_select_related = ('author',)
+    readonly_fields = ('in_favorite', 'thumbnail')
+    autocomplete_fields = ('author',)
     filter_horizontal = ('tags',)
     inlines = (IngredientRecipeInline,)
 
+    def save_related(self, request, form, formsets, change):
+        """Переносит изменения ингредиентов в списки покупок."""
+        old_amounts = CartIngredient.objects.get_recipe_amounts(
+            form.instance.id
+        )
+        super().save_related(request, form, formsets, change)
+        CartIngredient.objects.change_recipe(form.instance.id, old_amounts)
+
     def in_favorite(self, obj):
-        """Считает количество добавлений в избранное."""
-        return obj.in_favorite.all().count()
+        """Количество добавлений в избранное из счетчика рецепта."""
+        return obj.favorites_count
 
     in_favorite.short_description = 'Количество добавлений в избранное'
+    in_favorite.admin_order_field = 'favorites_count'
 
 
 @admin.register(IngredientRecipe)
-class IngredientRecipeAdmin(admin.ModelAdmin):
+class IngredientRecipeAdmin(LargeTableAdmin):
     """Управление ингредиентами в рецепте через админ панель."""
     list_display = (
         'recipe',
         'ingredient',
         'amount',
     )
-    list_filter = ('recipe', 'ingredient')
+    list_filter = (
+        ('recipe', AutocompleteFilter),
+        ('ingredient', AutocompleteFilter)
+    )
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(LargeTableAdmin):
     """Управление избранными рецептами через админ панель."""
     list_display = ('user', 'recipe')
-    list_filter = ('user', 'recipe')
-    search_fields = ('user', 'recipe')
+    list_filter = (
+        ('user', AutocompleteFilter),
+        ('recipe', AutocompleteFilter)
+    )
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
 
 
 @admin.register(Cart)
-class CartAdmin(admin.ModelAdmin):
+class CartAdmin(LargeTableAdmin):
     """Управление продуктовой корзиной через админ панель."""
     list_display = ('recipe', 'user')
-    list_filter = ('recipe', 'user')
-    search_fields = ('user',)
+    list_filter = (
+        ('recipe', AutocompleteFilter),
+        ('user', AutocompleteFilter)
+    )
+    list_select_related = ('recipe', 'user')
+    search_fields = ('user__username',)
+    autocomplete_fields = ('recipe', 'user')
+
+
+@admin.register(CartIngredient)
+class CartIngredientAdmin(LargeTableAdmin):
+    """Просмотр списков покупок через админ панель."""
+    list_display = ('user', 'ingredient', 'amount')
+    list_select_related = ('user', 'ingredient')
+    search_fields = ('user__username',)
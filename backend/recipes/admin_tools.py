@@ -0,0 +1,115 @@
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Постраничный вывод списков админки без COUNT(*) по всей таблице.
+    Для нефильтрованных списков в PostgreSQL количество строк берется
+    из статистики pg_class; маленькие таблицы и отфильтрованные списки
+    считаются точно.
+    """
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.has_filters():
+            estimate = self.get_estimate(queryset)
+            if estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+    @staticmethod
+    def get_estimate(queryset):
+        """Возвращает оценку количества строк в таблице модели."""
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = to_regclass(%s)',
+                [connection.ops.quote_name(queryset.model._meta.db_table)]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else 0
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """
+    Фильтр по связанной модели с поиском вместо списка всех значений.
+    Из базы загружается только выбранный объект, остальные варианты
+    подбирает виджет автодополнения админки.
+    """
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin,
+                 field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        super().__init__(
+            field, request, params, model, model_admin, field_path
+        )
+        self.lookup_val = self.used_parameters.get(self.lookup_kwarg)
+        self.form_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            required=False,
+            widget=AutocompleteSelect(field, model_admin.admin_site)
+        )
+
+    def has_output(self):
+        return True
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def queryset(self, request, queryset):
+        try:
+            return queryset.filter(**self.used_parameters)
+        except (ValueError, ValidationError) as error:
+            raise IncorrectLookupParameters(error)
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': changelist.get_query_string(
+                remove=[self.lookup_kwarg]
+            ),
+            'display': _('All'),
+        }
+
+    def rendered_widget(self):
+        """Отрисовывает поле автодополнения с выбранным значением."""
+        return self.form_field.widget.render(
+            self.lookup_kwarg,
+            self.lookup_val,
+            attrs={
+                'class': 'autocomplete-filter',
+                'data-parameter': self.lookup_kwarg,
+                'style': 'width: 100%',
+            }
+        )
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Базовая админка для больших таблиц: приблизительное количество
+    строк в списке и поддержка фильтров AutocompleteFilter.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        return (
+            super().media
+            + AutocompleteSelect(None, self.admin_site).media
+            + forms.Media(js=('admin/js/autocomplete_filter.js',))
+        )
@@ -5,3 +5,7 @@ class RecipesConfig(AppConfig):
     """Настройки приложения Recipes."""
     name = 'recipes'
     verbose_name = 'Управление рецептами'
+
+    def ready(self):
+        import recipes.images  # noqa: F401
+        import recipes.signals  # noqa: F401
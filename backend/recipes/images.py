@@ -0,0 +1,120 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps, features
+
+from .models import Recipe
+from .signals import recipe_images_processed
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    """Создает пул потоков для обработки фото при первом обращении."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.RECIPE_IMAGE_WORKERS
+        )
+    return _executor
+
+
+def get_image_format():
+    """Формат сохранения фото: WebP, если Pillow его поддерживает."""
+    if settings.RECIPE_IMAGE_FORMAT == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return settings.RECIPE_IMAGE_FORMAT
+
+
+def encode_image(image, size, image_format):
+    """Уменьшает фото до size и сжимает его в заданном формате."""
+    image = image.copy()
+    image.thumbnail(size, Image.LANCZOS)
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, 'white')
+        image = image.convert('RGBA')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    buffer = BytesIO()
+    image.save(
+        buffer, image_format, quality=settings.RECIPE_IMAGE_QUALITY,
+        optimize=True,
+    )
+    return ContentFile(buffer.getvalue())
+
+
+def process_recipe_image(recipe_id):
+    """
+    Один раз декодирует загруженное фото рецепта, сохраняет его
+    уменьшенную копию и миниатюру и подменяет ими оригинал.
+    Если за время обработки фото заменили, результат удаляется.
+    """
+    recipe = Recipe.objects.filter(id=recipe_id).only(
+        'id', 'image', 'thumbnail'
+    ).first()
+    if recipe is None or not recipe.image or recipe.image_processed:
+        return
+    source = recipe.image.name
+    with default_storage.open(source) as f:
+        with Image.open(f) as image:
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    image_format = get_image_format()
+    extension = 'jpg' if image_format == 'JPEG' else image_format.lower()
+    stem = PurePosixPath(source).stem
+    image_name = default_storage.save(
+        f'{Recipe.image.field.upload_to}/{stem}.{extension}',
+        encode_image(image, settings.RECIPE_IMAGE_MAX_SIZE, image_format),
+    )
+    thumbnail_name = default_storage.save(
+        f'{Recipe.thumbnail.field.upload_to}/'
+        f'{PurePosixPath(image_name).stem}.{extension}',
+        encode_image(image, settings.RECIPE_THUMBNAIL_SIZE, image_format),
+    )
+    with transaction.atomic():
+        updated = Recipe.objects.filter(id=recipe_id, image=source).update(
+            image=image_name, thumbnail=thumbnail_name
+        )
+        if updated:
+            recipe_images_processed.send(Recipe, recipe_ids=[recipe_id])
+    for name in ((source,) if updated else (image_name, thumbnail_name)):
+        default_storage.delete(name)
+    if updated and recipe.thumbnail:
+        default_storage.delete(recipe.thumbnail.name)
+
+
+def run_in_worker(recipe_id):
+    """Обрабатывает фото в потоке пула со своим соединением с базой."""
+    try:
+        process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception('Не удалось обработать фото рецепта %s', recipe_id)
+    finally:
+        connections.close_all()
+
+
+def submit_recipe_image(recipe_id):
+    """Ставит обработку фото рецепта в очередь пула."""
+    return get_executor().submit(run_in_worker, recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+def schedule_recipe_image(sender, instance, **kwargs):
+    """
+    После фиксации транзакции отправляет новое фото рецепта
+    на обработку в пул.
+    """
+    if instance.image and not instance.image_processed:
+        transaction.on_commit(lambda: submit_recipe_image(instance.id))
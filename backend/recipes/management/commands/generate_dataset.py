@@ -0,0 +1,235 @@
+import csv
+import os
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from recipes.models import (Cart, Favorite, Ingredient, IngredientRecipe,
+                            Recipe, Tag)
+from users.models import Follow, User
+
+PREFIX = 'seed'
+
+
+class Command(BaseCommand):
+    """
+    Команда 'generate_dataset' наполняет базу синтетическими данными
+    для замеров производительности: пользователи, подписки, рецепты,
+    избранное и корзины. Популярность тегов, ингредиентов, авторов
+    и рецептов распределена по закону Ципфа.
+    """
+    help = 'Создает синтетический набор данных для нагрузочных замеров.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--tags', type=int, default=8)
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, nargs=2, default=(3, 12),
+            metavar=('MIN', 'MAX')
+        )
+        parser.add_argument('--follows-per-user', type=int, default=10)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--carts-per-user', type=int, default=5)
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель распределения Ципфа.'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--csv',
+            default=os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv'),
+            help='Файл, из которого берутся ингредиенты.'
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить ранее созданные синтетические данные.'
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+        with transaction.atomic():
+            if options['clear']:
+                deleted, _ = User.objects.filter(
+                    username__startswith=f'{PREFIX}_'
+                ).delete()
+                Tag.objects.filter(slug__startswith=f'{PREFIX}-').delete()
+                self.stdout.write(f'Удалено объектов: {deleted}')
+            users = self.create_users(options['users'])
+            tags = self.create_tags(options['tags'])
+            ingredients = self.get_ingredients(options['csv'])
+            recipes = self.create_recipes(
+                options['recipes'], users, tags, ingredients, options
+            )
+            self.create_relations(users, recipes, options)
+        call_command('rebuild_shopping_lists', stdout=self.stdout)
+        call_command('reconcile_counters', stdout=self.stdout)
+        self.stdout.write(
+            f'Создано: пользователей {len(users)}, рецептов {len(recipes)} '
+            f'за {time.perf_counter() - started:.1f} с.'
+        )
+
+    def zipf_sampler(self, population, exponent):
+        """
+        Возвращает функцию, выбирающую k разных элементов population:
+        элемент с рангом r выбирается с весом 1 / r ** exponent.
+        """
+        population = list(population)
+        self.random.shuffle(population)
+        cum_weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, len(population) + 1)
+        ))
+
+        def sample(k):
+            k = min(k, len(population))
+            chosen = {}
+            while len(chosen) < k:
+                for item in self.random.choices(
+                    population, cum_weights=cum_weights, k=k - len(chosen)
+                ):
+                    chosen[id(item)] = item
+            return list(chosen.values())
+        return sample
+
+    def create_users(self, count):
+        """Создает пользователей с одним общим паролем."""
+        run = int(time.time())
+        password = make_password(f'{PREFIX}-password')
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f'{PREFIX}_{run}_{number}',
+                    email=f'{PREFIX}_{run}_{number}@example.com',
+                    first_name='Имя',
+                    last_name='Фамилия',
+                    password=password,
+                )
+                for number in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+        return list(User.objects.filter(
+            username__startswith=f'{PREFIX}_{run}_'
+        ))
+
+    def create_tags(self, count):
+        """
+        Дополняет теги до заданного количества. Теги создаются
+        по одному, чтобы каждому назначился бит маски.
+        """
+        tags = list(Tag.objects.all())
+        for number in range(len(tags), count):
+            Tag.objects.create(
+                name=f'{PREFIX}-tag-{number}',
+                slug=f'{PREFIX}-{number}',
+                color=f'#{self.random.randrange(0x1000000):06X}',
+            )
+        return list(Tag.objects.all())
+
+    def get_ingredients(self, path):
+        """Берет из базы ингредиенты, перечисленные в csv файле."""
+        try:
+            with open(path, newline='', encoding='utf-8') as f:
+                names = [row[0] for row in csv.reader(f) if row]
+        except FileNotFoundError:
+            raise CommandError(f'Файл {path} не найден')
+        if not Ingredient.objects.filter(name__in=names[:1]).exists():
+            call_command('load_ingredients', path, stdout=self.stdout)
+        ingredients = list(Ingredient.objects.filter(name__in=names))
+        if not ingredients:
+            raise CommandError('Нет ингредиентов для рецептов')
+        return ingredients
+
+    def create_recipes(self, count, users, tags, ingredients, options):
+        """Создает рецепты с тегами и ингредиентами."""
+        run = int(time.time())
+        pick_author = self.zipf_sampler(users, options['zipf'])
+        pick_tags = self.zipf_sampler(tags, options['zipf'])
+        pick_ingredients = self.zipf_sampler(ingredients, options['zipf'])
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    author=pick_author(1)[0],
+                    name=f'{PREFIX} {run} рецепт {number}',
+                    text=f'{PREFIX} {run} описание рецепта {number}',
+                    cooking_time=self.random.randint(1, 180),
+                )
+                for number in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+        recipes = list(Recipe.objects.filter(
+            name__startswith=f'{PREFIX} {run} '
+        ))
+        now = timezone.now()
+        for recipe in recipes:
+            recipe.pub_date = now - timedelta(
+                minutes=self.random.randrange(365 * 24 * 60)
+            )
+        Recipe.objects.bulk_update(
+            recipes, ['pub_date'], batch_size=self.batch_size
+        )
+        Recipe.tags.through.objects.bulk_create(
+            (
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+                for recipe in recipes
+                for tag in pick_tags(self.random.randint(1, 3))
+            ),
+            batch_size=self.batch_size,
+        )
+        Recipe.objects.filter(
+            name__startswith=f'{PREFIX} {run} '
+        ).update_tags_mask()
+        low, high = options['ingredients_per_recipe']
+        IngredientRecipe.objects.bulk_create(
+            (
+                IngredientRecipe(
+                    recipe=recipe,
+                    ingredient=ingredient,
+                    amount=self.random.randint(1, 500),
+                )
+                for recipe in recipes
+                for ingredient in pick_ingredients(
+                    self.random.randint(low, high)
+                )
+            ),
+            batch_size=self.batch_size,
+        )
+        return recipes
+
+    def create_relations(self, users, recipes, options):
+        """Создает подписки, избранное и корзины пользователей."""
+        pick_author = self.zipf_sampler(users, options['zipf'])
+        pick_recipes = self.zipf_sampler(recipes, options['zipf'])
+        Follow.objects.bulk_create(
+            (
+                Follow(user=user, author=author)
+                for user in users
+                for author in pick_author(options['follows_per_user'])
+                if author.id != user.id
+            ),
+            batch_size=self.batch_size,
+        )
+        for model, per_user in (
+            (Favorite, options['favorites_per_user']),
+            (Cart, options['carts_per_user']),
+        ):
+            model.objects.bulk_create(
+                (
+                    model(user=user, recipe=recipe)
+                    for user in users
+                    for recipe in pick_recipes(per_user)
+                ),
+                batch_size=self.batch_size,
+            )
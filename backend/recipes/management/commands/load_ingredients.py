@@ -1,30 +1,199 @@
 import csv
+import json
+import os
+import time
+from itertools import islice
 
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
 from recipes.models import Ingredient
+from recipes.signals import ingredients_imported
+
+READ_SIZE = 64 * 1024
+
+
+class JSONArrayReader:
+    """
+    Поэлементно читает json-массив из файла. В памяти хранится
+    только текущий элемент и непрочитанный остаток буфера,
+    поэтому размер файла не ограничен памятью процесса.
+    """
+    def __init__(self, f, read_size=READ_SIZE):
+        self.f = f
+        self.read_size = read_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.eof = False
+
+    def read(self):
+        """Дочитывает очередную часть файла в буфер."""
+        chunk = self.f.read(self.read_size)
+        self.eof = not chunk
+        self.buffer += chunk
+
+    def next_char(self):
+        """Возвращает следующий непробельный символ, не снимая его."""
+        self.buffer = self.buffer.lstrip()
+        while not self.buffer and not self.eof:
+            self.read()
+            self.buffer = self.buffer.lstrip()
+        return self.buffer[:1]
+
+    def expect(self, chars):
+        """Снимает из буфера один из ожидаемых символов."""
+        char = self.next_char()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(
+                f'Ожидался один из символов {chars}', self.buffer, 0
+            )
+        self.buffer = self.buffer[1:]
+        return char
+
+    def decode_item(self):
+        """Разбирает очередной элемент, дочитывая файл при необходимости."""
+        self.next_char()
+        while True:
+            try:
+                item, end = self.decoder.raw_decode(self.buffer)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self.read()
+                continue
+            if end == len(self.buffer) and not self.eof:
+                self.read()
+                continue
+            self.buffer = self.buffer[end:]
+            return item
+
+    def __iter__(self):
+        self.expect('[')
+        if self.next_char() == ']':
+            return
+        while True:
+            yield self.decode_item()
+            if self.expect(',]') == ']':
+                return
 
 
 class Command(BaseCommand):
     """
     Команда 'load_ingredients' загружает ингредиенты
-    в базу из csv файла, расположенном в директории /data/
+    в базу из csv или json файла, по умолчанию - data/ingredients.csv.
+    Файл читается частями, json - поэлементно, без загрузки
+    всего файла в память. Новые ингредиенты добавляются, а у
+    существующих обновляется единица измерения. Повторная загрузка
+    того же файла ничего не меняет.
     """
+    help = 'Загружает ингредиенты из csv или json файла.'
 
-    def handle(self, *args, **options):
-        self.import_ingredients()
-        print('Загрузка ингредиентов завершена.')
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            default=os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv'),
+            help='Путь к файлу с ингредиентами.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Количество строк, обрабатываемых за один запрос.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Посчитать изменения и откатить транзакцию.'
+        )
+        parser.add_argument(
+            '--format', choices=('csv', 'json'),
+            help='Формат файла, по умолчанию - по расширению.'
+        )
 
-    def import_ingredients(self, file='ingredients.csv'):
-        print(f'Загрузка {file}...')
-        file_path = f'./data/{file}'
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть не меньше 1')
+        path = options['path']
+        file_format = options['format'] or (
+            'json' if path.endswith('.json') else 'csv'
+        )
+        self.stdout.write(f'Загрузка {path}...')
+        self.counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
+        self.seen = set()
+        started = time.perf_counter()
         try:
-            with open(file_path, newline='', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                for row in reader:
-                    status, created = Ingredient.objects.update_or_create(
-                        name=row[0],
-                        measurement_unit=row[1]
-                    )
+            with open(path, newline='', encoding='utf-8') as f:
+                rows = (
+                    self.read_json(f) if file_format == 'json'
+                    else self.read_csv(f)
+                )
+                with transaction.atomic():
+                    while True:
+                        chunk = list(islice(rows, options['chunk_size']))
+                        if not chunk:
+                            break
+                        self.import_chunk(chunk)
+                    if options['dry_run']:
+                        transaction.set_rollback(True)
+                    else:
+                        transaction.on_commit(
+                            lambda: ingredients_imported.send(sender=Command)
+                        )
         except FileNotFoundError:
-            raise CommandError(f'Файл {file} отсутствует в каталоге data')
+            raise CommandError(f'Файл {path} не найден')
+        except (json.JSONDecodeError, UnicodeDecodeError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+        elapsed = time.perf_counter() - started
+        total = sum(self.counts.values())
+        self.stdout.write(
+            f'Загрузка ингредиентов завершена'
+            f'{" (без сохранения)" if options["dry_run"] else ""}: '
+            f'добавлено {self.counts["inserted"]}, '
+            f'обновлено {self.counts["updated"]}, '
+            f'пропущено {self.counts["skipped"]}; '
+            f'{total} строк за {elapsed:.2f} с '
+            f'({total / elapsed if elapsed else total:.0f} строк/с).'
+        )
+
+    def read_csv(self, f):
+        """Читает пары (название, единица измерения) из csv."""
+        for row in csv.reader(f):
+            if len(row) < 2:
+                self.counts['skipped'] += 1
+                continue
+            yield row[0], row[1]
+
+    def read_json(self, f):
+        """Поэлементно читает пары (название, единица измерения) из json."""
+        for item in JSONArrayReader(f):
+            if not isinstance(item, dict):
+                self.counts['skipped'] += 1
+                continue
+            yield item.get('name', ''), item.get('measurement_unit', '')
+
+    def import_chunk(self, chunk):
+        """Добавляет и обновляет ингредиенты одной части файла."""
+        units = {}
+        for name, measurement_unit in chunk:
+            name, measurement_unit = name.strip(), measurement_unit.strip()
+            if not name or not measurement_unit or name in self.seen:
+                self.counts['skipped'] += 1
+                continue
+            self.seen.add(name)
+            units[name] = measurement_unit
+        existing = Ingredient.objects.in_bulk(
+            list(units), field_name='name'
+        )
+        changed = []
+        for name, ingredient in existing.items():
+            if ingredient.measurement_unit == units[name]:
+                self.counts['skipped'] += 1
+                continue
+            ingredient.measurement_unit = units[name]
+            changed.append(ingredient)
+        Ingredient.objects.bulk_update(changed, ['measurement_unit'])
+        created = Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit=measurement_unit)
+            for name, measurement_unit in units.items()
+            if name not in existing
+        )
+        self.counts['updated'] += len(changed)
+        self.counts['inserted'] += len(created)
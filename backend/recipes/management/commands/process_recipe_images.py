@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Команда 'process_recipe_images' уменьшает фото рецептов
+    и создает миниатюры для фото, которые еще не обработаны:
+    загруженных до появления обработки или потерянных пулом
+    при перезапуске.
+    """
+    help = 'Обрабатывает фото рецептов, для которых нет миниатюр.'
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        for recipe in Recipe.objects.exclude(image='').only(
+            'id', 'image', 'thumbnail'
+        ).iterator():
+            if recipe.image_processed:
+                continue
+            try:
+                process_recipe_image(recipe.id)
+            except OSError as error:
+                failed += 1
+                self.stderr.write(f'Рецепт {recipe.id}: {error}')
+            else:
+                processed += 1
+        self.stdout.write(
+            f'Обработано фото: {processed}, с ошибками: {failed}'
+        )
@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.models import CartIngredient, IngredientRecipe
+
+
+class Command(BaseCommand):
+    """
+    Команда 'rebuild_shopping_lists' пересобирает списки покупок
+    из продуктовых корзин и сверяет их с расчетом через GROUP BY.
+    """
+    help = 'Пересобирает и проверяет списки покупок пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Только сверить списки покупок, не изменяя их.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одном INSERT.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            self.rebuild(options['batch_size'])
+        differences = self.verify()
+        if differences:
+            raise CommandError(
+                f'Расхождений в списках покупок: {differences}'
+            )
+        self.stdout.write('Списки покупок совпадают с корзинами.')
+
+    @staticmethod
+    def get_live_amounts():
+        """Считает списки покупок напрямую по корзинам."""
+        return {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount
+            in IngredientRecipe.objects.filter(
+                recipe__cart__isnull=False
+            ).values_list(
+                'recipe__cart__user', 'ingredient'
+            ).annotate(amount=Sum('amount')).order_by().iterator()
+        }
+
+    def rebuild(self, batch_size):
+        """Заменяет все списки покупок пересчитанными."""
+        with transaction.atomic():
+            CartIngredient.objects.all().delete()
+            CartIngredient.objects.bulk_create(
+                (
+                    CartIngredient(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=amount,
+                    )
+                    for (user_id, ingredient_id), amount
+                    in self.get_live_amounts().items()
+                ),
+                batch_size=batch_size,
+            )
+        self.stdout.write(
+            f'Пересобрано строк: {CartIngredient.objects.count()}'
+        )
+
+    def verify(self):
+        """Возвращает число строк, отличающихся от расчета по корзинам."""
+        live = self.get_live_amounts()
+        stored = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount
+            in CartIngredient.objects.values_list(
+                'user_id', 'ingredient_id', 'amount'
+            ).iterator()
+        }
+        differences = 0
+        for key in live.keys() | stored.keys():
+            if live.get(key) != stored.get(key):
+                differences += 1
+                self.stderr.write(
+                    f'Пользователь {key[0]}, ингредиент {key[1]}: '
+                    f'ожидалось {live.get(key)}, в списке {stored.get(key)}'
+                )
+        return differences
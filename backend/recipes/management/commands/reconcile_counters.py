@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from recipes.counters import count
+from recipes.models import Cart, Favorite, Recipe
+from users.models import Follow, User
+
+
+class Command(BaseCommand):
+    """
+    Команда 'reconcile_counters' сверяет счетчики рецептов
+    и пользователей с таблицами избранного, корзин, подписок
+    и рецептов и исправляет расхождения.
+    """
+    help = 'Сверяет и исправляет счетчики рецептов и пользователей.'
+
+    counters = (
+        (Recipe, 'favorites_count', Favorite, 'recipe'),
+        (Recipe, 'in_carts_count', Cart, 'recipe'),
+        (User, 'followers_count', Follow, 'author'),
+        (User, 'recipes_count', Recipe, 'author'),
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Только сверить счетчики, не изменяя их.'
+        )
+
+    def handle(self, *args, **options):
+        differences = 0
+        with transaction.atomic():
+            for model, field, source, source_field in self.counters:
+                actual = count(source, source_field)
+                drifted = model.objects.filter(~Q(**{field: actual}))
+                if options['verify']:
+                    rows = drifted.count()
+                else:
+                    rows = drifted.update(**{field: actual})
+                differences += rows
+                self.stdout.write(
+                    f'{model._meta.model_name}.{field}: '
+                    f'расхождений {rows}'
+                )
+        if options['verify'] and differences:
+            raise CommandError(f'Расхождений в счетчиках: {differences}')
+        self.stdout.write('Счетчики совпадают с данными.')
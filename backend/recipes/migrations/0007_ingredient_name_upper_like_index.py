@@ -0,0 +1,35 @@
+# Generated by Django 3.2.14 on 2026-10-18 12:00
+
+from django.db import migrations
+
+INDEX_NAME = 'recipes_ingredient_name_upper_like'
+
+
+def create_index(apps, schema_editor):
+    """
+    Индекс для поиска ингредиентов по началу названия без учета
+    регистра: istartswith в PostgreSQL превращается в
+    UPPER(name::text) LIKE UPPER('...%'), которому не подходит
+    обычный индекс по name.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON recipes_ingredient '
+            f'(UPPER(name::text) text_pattern_ops)'
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_cartingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 3.2.14 on 2026-10-18 12:00
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+# Копия recipes.counters.count на момент миграции: миграции
+# не импортируют код приложения, который может измениться позже.
+def count(model, field):
+    """Подзапрос количества строк model, ссылающихся на внешнюю строку."""
+    return Coalesce(models.Subquery(
+        model.objects.filter(
+            **{field: models.OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            total=models.Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    """Считает счетчики существующих рецептов и авторов."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    User = apps.get_model('users', 'User')
+    Recipe.objects.update(
+        favorites_count=count(apps.get_model('recipes', 'Favorite'), 'recipe'),
+        in_carts_count=count(apps.get_model('recipes', 'Cart'), 'recipe'),
+    )
+    User.objects.update(recipes_count=count(Recipe, 'author'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_user_counters'),
+        ('recipes', '0012_tags_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество добавлений в корзину'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-in_carts_count', '-pub_date', '-id'], name='recipe_popular_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,23 @@
+from pathlib import Path
+
 from colorfield.fields import ColorField
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVectorField)
+from django.core.exceptions import EmptyResultSet, ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+
+from .search import SQLITE_FTS_TABLE, get_fts_query
+from users.models import CountersMixin
 
 User = get_user_model()
 
+POPULAR_ORDERING = ('-favorites_count', '-in_carts_count', '-pub_date', '-id')
+
 
 class Tag(models.Model):
     """Модель тегов."""
@@ -25,6 +37,12 @@ class Tag(models.Model):
         db_index=True,
         unique=True
     )
+    bit = models.PositiveSmallIntegerField(
+        verbose_name='Бит в маске тегов рецепта',
+        unique=True,
+        null=True,
+        editable=False,
+    )
 
     class Meta:
         ordering = ['name']
@@ -34,6 +52,43 @@ class Tag(models.Model):
     def __str__(self):
         return self.slug
 
+    @staticmethod
+    def get_free_bit():
+        """Свободный бит маски тегов или None, если свободных нет."""
+        used = set(Tag.objects.exclude(bit=None).values_list(
+            'bit', flat=True
+        ))
+        return next(
+            (bit for bit in range(settings.MAX_TAGS) if bit not in used),
+            None,
+        )
+
+    def clean(self):
+        """Проверяет, что для нового тега остался свободный бит маски."""
+        super().clean()
+        if self.bit is None and self.get_free_bit() is None:
+            raise ValidationError(settings.TAGS_LIMIT_ERROR)
+
+    def save(self, *args, **kwargs):
+        """
+        Назначает новому тегу свободный бит маски. Лимит тегов
+        проверяют clean() и сериализатор API; здесь он срабатывает,
+        только если тег создан в обход проверки.
+        """
+        if self.bit is None:
+            self.bit = self.get_free_bit()
+            if self.bit is None:
+                raise ValueError(settings.TAGS_LIMIT_ERROR)
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def get_mask(tags):
+        """Маска рецепта с тегами tags."""
+        mask = 0
+        for tag in tags:
+            mask |= 1 << tag.bit
+        return mask
+
 
 class Ingredient(models.Model):
     """Модель ингредиентов."""
@@ -57,7 +112,138 @@ class Ingredient(models.Model):
         return f'{self.name}, {self.measurement_unit}'
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    """Запросы к рецептам."""
+
+    def with_read_graph(self):
+        """
+        Загружает автора, теги и ингредиенты рецептов
+        постоянным числом запросов, независимо от размера выборки.
+        """
+        return self.select_related('author').prefetch_related(
+            'tags',
+            models.Prefetch(
+                'ingridients_recipe',
+                queryset=IngredientRecipe.objects.select_related(
+                    'ingredient'
+                ),
+            ),
+        )
+
+    def with_user_flags(self, user):
+        """
+        Добавляет признаки нахождения рецепта в избранном
+        и в продуктовой корзине пользователя.
+        """
+        if user.is_anonymous:
+            return self
+        return self.annotate(
+            is_favorited=models.Exists(Favorite.objects.filter(
+                user=user, recipe=models.OuterRef('pk'))),
+            is_in_shopping_cart=models.Exists(Cart.objects.filter(
+                user=user, recipe=models.OuterRef('pk'))),
+        )
+
+    def search(self, value):
+        """
+        Полнотекстовый поиск по названию и описанию, лучшие
+        совпадения первыми. В PostgreSQL - по search_vector,
+        в SQLite - по таблице FTS5, в остальных базах - icontains.
+        """
+        vendor = connections[self.db].vendor
+        if vendor == 'postgresql':
+            query = SearchQuery(
+                value,
+                config=settings.RECIPE_SEARCH_CONFIG,
+                search_type='websearch',
+            )
+            return self.filter(search_vector=query).annotate(
+                search_rank=SearchRank(models.F('search_vector'), query)
+            ).order_by('-search_rank', '-pub_date', '-id')
+        if vendor == 'sqlite':
+            match = get_fts_query(value)
+            if not match:
+                return self.none()
+            table = self.model._meta.db_table
+            return self.filter(id__in=RawSQL(
+                f'SELECT rowid FROM {SQLITE_FTS_TABLE} '
+                f'WHERE {SQLITE_FTS_TABLE} MATCH %s', (match,)
+            )).annotate(search_rank=RawSQL(
+                f'SELECT -bm25({SQLITE_FTS_TABLE}, 10.0, 1.0) '
+                f'FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s '
+                f'AND rowid = {table}.id', (match,)
+            )).order_by('-search_rank', '-pub_date', '-id')
+        return self.filter(
+            models.Q(name__icontains=value) | models.Q(text__icontains=value)
+        )
+
+    def with_tags(self, mask, match_all=False):
+        """
+        Рецепты с любым (или со всеми при match_all) тегом из маски.
+        Одно побитовое условие вместо соединения с таблицей тегов.
+        """
+        queryset = self.alias(matched_tags=models.F('tags_mask').bitand(mask))
+        if match_all:
+            return queryset.filter(matched_tags=mask)
+        return queryset.filter(matched_tags__gt=0)
+
+    def update_tags_mask(self):
+        """
+        Пересчитывает маску тегов рецептов выборки по таблице связей.
+        Возвращает словарь {id рецепта: маска}.
+        """
+        masks = dict.fromkeys(self.values_list('id', flat=True), 0)
+        if not masks:
+            return masks
+        for recipe_id, bit in self.model.tags.through.objects.filter(
+            recipe__in=self.values('id')
+        ).values_list('recipe_id', 'tag__bit'):
+            masks[recipe_id] |= 1 << bit
+        self.model.objects.bulk_update(
+            [
+                self.model(id=recipe_id, tags_mask=mask)
+                for recipe_id, mask in masks.items()
+            ],
+            ['tags_mask'],
+            batch_size=1000,
+        )
+        return masks
+
+    def remove_tag_bit(self, tag):
+        """Снимает бит тега в масках рецептов выборки."""
+        return self.update(
+            tags_mask=models.F('tags_mask').bitand(~(1 << tag.bit))
+        )
+
+    def popular(self):
+        """Сортирует рецепты по счетчикам избранного и корзин."""
+        return self.order_by(*POPULAR_ORDERING)
+
+    def latest_per_author(self, limit):
+        """
+        Возвращает не более limit последних рецептов каждого автора
+        одним запросом с нумерацией строк в разрезе автора.
+        Для заведомо пустой выборки запрос не выполняется.
+        """
+        queryset = self.annotate(
+            preview_position=models.Window(
+                expression=RowNumber(),
+                partition_by=models.F('author'),
+                order_by=models.F('pub_date').desc(),
+            )
+        )
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return self.none()
+        return self.model.objects.raw(
+            f'SELECT * FROM ({sql}) AS ranked '
+            f'WHERE preview_position <= %s ORDER BY preview_position',
+            (*params, limit)
+        )
+
+
+class Recipe(CountersMixin, models.Model):
     """Модель рецептов."""
     author = models.ForeignKey(
         User,
@@ -75,6 +261,11 @@ class Recipe(models.Model):
         verbose_name='Фото рецепта',
         upload_to='recipes/images'
     )
+    thumbnail = models.ImageField(
+        blank=True,
+        verbose_name='Миниатюра фото рецепта',
+        upload_to='recipes/thumbnails'
+    )
     text = models.TextField(
         verbose_name='Описание рецепта',
         unique=True
@@ -107,15 +298,58 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True
     )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+    )
+    tags_mask = models.BigIntegerField(
+        verbose_name='Маска тегов',
+        default=0,
+        editable=False,
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Количество добавлений в избранное',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='Количество добавлений в корзину',
+        default=0,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
+    counter_fields = ('favorites_count', 'in_carts_count')
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=POPULAR_ORDERING,
+                name='recipe_popular_idx'
+            ),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
     def __str__(self):
         return self.name
 
+    @property
+    def image_processed(self):
+        """Фото уже уменьшено и для него есть миниатюра."""
+        return bool(self.thumbnail) and (
+            Path(self.thumbnail.name).stem == Path(self.image.name).stem
+        )
+
 
 class IngredientRecipe(models.Model):
     """Модель ингредиентов в рецепте."""
@@ -179,6 +413,12 @@ class Favorite(models.Model):
                 name='unique_favorites',
             ),
         )
+        indexes = [
+            models.Index(
+                fields=('recipe', 'user'),
+                name='favorite_recipe_user_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user} добавил "{self.recipe}" в Избранное'
@@ -207,6 +447,134 @@ class Cart(models.Model):
                 name='unique_user_recipe_shopping_list'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('recipe', 'user'),
+                name='cart_recipe_user_idx'
+            ),
+        ]
 
     def __str__(self):
         return (f'Список покупок пользователя {self.user.username}')
+
+
+class CartIngredientQuerySet(models.QuerySet):
+    """Поддержка списков покупок в актуальном состоянии."""
+
+    @staticmethod
+    def get_recipe_amounts(recipe_id):
+        """Возвращает количество каждого ингредиента рецепта."""
+        return dict(IngredientRecipe.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', 'amount'))
+
+    def apply_changes(self, user_ids, changes):
+        """
+        Прибавляет к спискам покупок пользователей изменения
+        количества ингредиентов вида {ingredient_id: delta}.
+        Строки пользователей блокируются до чтения списков:
+        select_for_update не блокирует еще не созданные строки,
+        и без этого два параллельных добавления одного нового
+        ингредиента вставили бы его дважды. Блокировки берутся
+        в порядке id, чтобы не было взаимных блокировок.
+        """
+        changes = {
+            ingredient_id: delta
+            for ingredient_id, delta in changes.items() if delta
+        }
+        user_ids = list(user_ids)
+        if not changes or not user_ids:
+            return
+        rows = self.filter(user_id__in=user_ids, ingredient_id__in=changes)
+        with transaction.atomic():
+            list(User.objects.select_for_update().filter(
+                id__in=user_ids
+            ).order_by('id').values_list('id', flat=True))
+            existing = set(rows.values_list(
+                'user_id', 'ingredient_id'
+            ))
+            rows.update(amount=models.F('amount') + models.Case(
+                *(
+                    models.When(ingredient_id=ingredient_id, then=delta)
+                    for ingredient_id, delta in changes.items()
+                ),
+                output_field=models.IntegerField(),
+            ))
+            self.bulk_create(
+                self.model(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    amount=delta,
+                )
+                for user_id in user_ids
+                for ingredient_id, delta in changes.items()
+                if delta > 0 and (user_id, ingredient_id) not in existing
+            )
+            rows.filter(amount__lte=0).delete()
+
+    def add_recipe(self, user_ids, recipe_id):
+        """Добавляет ингредиенты рецепта в списки покупок."""
+        self.apply_changes(user_ids, self.get_recipe_amounts(recipe_id))
+
+    def remove_recipe(self, user_ids, recipe_id):
+        """Вычитает ингредиенты рецепта из списков покупок."""
+        self.apply_changes(user_ids, {
+            ingredient_id: -amount for ingredient_id, amount
+            in self.get_recipe_amounts(recipe_id).items()
+        })
+
+    def change_recipe(self, recipe_id, old_amounts, new_amounts=None):
+        """
+        Переносит изменение ингредиентов рецепта в списки покупок
+        всех пользователей, у которых рецепт лежит в корзине.
+        Если новые количества не переданы, они читаются из базы.
+        """
+        user_ids = list(Cart.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True))
+        if not user_ids:
+            return
+        changes = dict(
+            self.get_recipe_amounts(recipe_id)
+            if new_amounts is None else new_amounts
+        )
+        for ingredient_id, amount in old_amounts.items():
+            changes[ingredient_id] = changes.get(ingredient_id, 0) - amount
+        self.apply_changes(user_ids, changes)
+
+
+class CartIngredient(models.Model):
+    """
+    Модель списка покупок: суммарное количество ингредиента
+    во всех рецептах из продуктовой корзины пользователя.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Ингредиент'
+    )
+    amount = models.IntegerField(
+        verbose_name='Количество'
+    )
+
+    objects = CartIngredientQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_user_ingredient_shopping_list'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} – {self.amount}'
@@ -0,0 +1,130 @@
+import re
+
+from django.conf import settings
+from django.db.migrations.recorder import MigrationRecorder
+
+SEARCH_MIGRATION = ('recipes', '0011_recipe_search_vector')
+POSTGRES_INDEX = 'recipe_search_vector_idx'
+SQLITE_FTS_TABLE = 'recipes_recipe_fts'
+SQLITE_TRIGGERS = ('insert', 'delete', 'update')
+
+
+def get_postgres_sql():
+    """
+    GIN-индекс и триггер, пересчитывающий search_vector при записи
+    названия или описания: название весит больше (A), чем описание (B).
+    """
+    config = settings.RECIPE_SEARCH_CONFIG
+    return (
+        f'CREATE INDEX IF NOT EXISTS {POSTGRES_INDEX} '
+        f'ON recipes_recipe USING gin (search_vector)',
+        f'''
+        CREATE OR REPLACE FUNCTION recipes_recipe_search_vector_update()
+        RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('{config}', coalesce(NEW.name, '')),
+                          'A') ||
+                setweight(to_tsvector('{config}', coalesce(NEW.text, '')),
+                          'B');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        ''',
+        'DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger '
+        'ON recipes_recipe',
+        'CREATE TRIGGER recipes_recipe_search_vector_trigger '
+        'BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe '
+        'FOR EACH ROW EXECUTE PROCEDURE '
+        'recipes_recipe_search_vector_update()',
+        'UPDATE recipes_recipe SET name = name WHERE search_vector IS NULL',
+    )
+
+
+SQLITE_SQL = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5('
+    f"name, text, content='recipes_recipe', content_rowid='id')",
+    f'CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_insert '
+    f'AFTER INSERT ON recipes_recipe BEGIN '
+    f'INSERT INTO {SQLITE_FTS_TABLE}(rowid, name, text) '
+    f'VALUES (new.id, new.name, new.text); END',
+    f'CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_delete '
+    f'AFTER DELETE ON recipes_recipe BEGIN '
+    f'INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, name, text) '
+    f"VALUES ('delete', old.id, old.name, old.text); END",
+    f'CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_update '
+    f'AFTER UPDATE OF name, text ON recipes_recipe BEGIN '
+    f'INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, name, text) '
+    f"VALUES ('delete', old.id, old.name, old.text); "
+    f'INSERT INTO {SQLITE_FTS_TABLE}(rowid, name, text) '
+    f'VALUES (new.id, new.name, new.text); END',
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')",
+)
+
+
+def create_search_index(connection):
+    """
+    Создает поисковый индекс рецептов: tsvector с GIN-индексом
+    в PostgreSQL или таблицу FTS5 в SQLite. Индекс поддерживается
+    триггерами, поэтому обновляется и при bulk_create.
+    """
+    if connection.vendor == 'postgresql':
+        statements = get_postgres_sql()
+    elif connection.vendor == 'sqlite':
+        statements = SQLITE_SQL
+    else:
+        return
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def drop_search_index(connection):
+    """Удаляет поисковый индекс рецептов."""
+    if connection.vendor == 'postgresql':
+        statements = (
+            'DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger '
+            'ON recipes_recipe',
+            'DROP FUNCTION IF EXISTS recipes_recipe_search_vector_update()',
+            f'DROP INDEX IF EXISTS {POSTGRES_INDEX}',
+        )
+    elif connection.vendor == 'sqlite':
+        statements = tuple(
+            f'DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_{name}'
+            for name in SQLITE_TRIGGERS
+        ) + (f'DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}',)
+    else:
+        return
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def restore_sqlite_triggers(connection):
+    """
+    SQLite пересоздает таблицу при изменении ее схемы и теряет
+    триггеры, поэтому после миграций они создаются заново.
+    """
+    if (
+        connection.vendor != 'sqlite'
+        or SEARCH_MIGRATION not in
+        MigrationRecorder(connection).applied_migrations()
+    ):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' "
+            "AND name LIKE %s", (f'{SQLITE_FTS_TABLE}_%',)
+        )
+        if cursor.fetchone()[0] < len(SQLITE_TRIGGERS):
+            create_search_index(connection)
+
+
+def get_fts_query(value):
+    """
+    Превращает строку поиска в запрос FTS5: каждое слово ищется
+    как префикс, все слова должны встретиться.
+    """
+    return ' '.join(
+        f'"{word}"*' for word in re.findall(r'\w+', value.lower())
+    )
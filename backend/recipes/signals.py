@@ -0,0 +1,101 @@
+from django.db import connections
+from django.db.models.signals import (m2m_changed, post_delete, post_migrate,
+                                      post_save, pre_delete)
+from django.dispatch import Signal, receiver
+
+from .models import Cart, CartIngredient, Favorite, Recipe, Tag
+from .search import restore_sqlite_triggers
+from users.models import User, change_counter
+
+ingredients_imported = Signal()
+recipe_images_processed = Signal()
+
+COUNTER_FIELDS = {
+    Favorite: 'favorites_count',
+    Cart: 'in_carts_count',
+}
+
+
+@receiver(post_save, sender=Cart)
+def add_recipe_to_shopping_list(sender, instance, created, **kwargs):
+    """Добавляет ингредиенты рецепта в список покупок."""
+    if created:
+        CartIngredient.objects.add_recipe(
+            [instance.user_id], instance.recipe_id
+        )
+
+
+@receiver(pre_delete, sender=Cart)
+def remove_recipe_from_shopping_list(sender, instance, **kwargs):
+    """
+    Вычитает ингредиенты рецепта из списка покупок.
+    Срабатывает до удаления, пока ингредиенты рецепта еще в базе.
+    """
+    CartIngredient.objects.remove_recipe(
+        [instance.user_id], instance.recipe_id
+    )
+
+
+@receiver(post_migrate)
+def restore_search_index(sender, using, **kwargs):
+    """Восстанавливает триггеры поиска после пересоздания таблицы."""
+    if sender.name == 'recipes':
+        restore_sqlite_triggers(connections[using])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def update_tags_mask(sender, instance, action, reverse, pk_set, **kwargs):
+    """Поддерживает маску тегов рецепта при изменении recipe.tags."""
+    if reverse and action == 'pre_clear':
+        Recipe.objects.filter(tags=instance).remove_tag_bit(instance)
+    elif reverse and action in ('post_add', 'post_remove'):
+        Recipe.objects.filter(pk__in=pk_set).update_tags_mask()
+    elif not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        instance.tags_mask = Recipe.objects.filter(
+            pk=instance.pk
+        ).update_tags_mask()[instance.pk]
+
+
+@receiver(pre_delete, sender=Tag)
+def remove_tag_from_masks(sender, instance, **kwargs):
+    """Освобождает бит удаляемого тега в масках рецептов."""
+    if instance.bit is not None:
+        Recipe.objects.filter(tags=instance).remove_tag_bit(instance)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=Cart)
+def increase_recipe_counter(sender, instance, created, **kwargs):
+    """Увеличивает счетчик избранного или корзин рецепта."""
+    if created:
+        change_counter(
+            Recipe.objects.filter(pk=instance.recipe_id),
+            COUNTER_FIELDS[sender], 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=Cart)
+def decrease_recipe_counter(sender, instance, **kwargs):
+    """Уменьшает счетчик избранного или корзин рецепта."""
+    change_counter(
+        Recipe.objects.filter(pk=instance.recipe_id),
+        COUNTER_FIELDS[sender], -1
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def increase_recipes_count(sender, instance, created, **kwargs):
+    """Увеличивает счетчик рецептов автора."""
+    if created:
+        change_counter(
+            User.objects.filter(pk=instance.author_id), 'recipes_count', 1
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def decrease_recipes_count(sender, instance, **kwargs):
+    """Уменьшает счетчик рецептов автора."""
+    change_counter(
+        User.objects.filter(pk=instance.author_id), 'recipes_count', -1
+    )
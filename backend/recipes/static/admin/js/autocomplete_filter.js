@@ -0,0 +1,16 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    $(document).on('change', 'select.autocomplete-filter', function() {
+        const params = new URLSearchParams(window.location.search);
+        params.delete('p');
+        params.delete('e');
+        if (this.value) {
+            params.set(this.dataset.parameter, this.value);
+        } else {
+            params.delete(this.dataset.parameter);
+        }
+        window.location.search = params.toString();
+    });
+}
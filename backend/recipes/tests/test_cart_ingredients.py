@@ -0,0 +1,53 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import CartIngredient, Ingredient
+from users.models import User
+
+
+class CartIngredientChangesTest(TestCase):
+    """Изменение списков покупок под блокировкой пользователей."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                username=f'user{number}',
+                email=f'user{number}@example.com',
+                password='Pa55word-for-tests',
+            )
+            for number in range(2)
+        ]
+        cls.salt, cls.sugar = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('соль', 'сахар')
+        )
+
+    def amounts(self, user):
+        return dict(CartIngredient.objects.filter(user=user).values_list(
+            'ingredient_id', 'amount'
+        ))
+
+    def test_users_locked_before_reading(self):
+        with CaptureQueriesContext(connection) as context:
+            CartIngredient.objects.apply_changes(
+                [user.id for user in self.users], {self.salt.id: 5}
+            )
+        selects = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+        ]
+        self.assertIn('FROM "users_user"', selects[0])
+        self.assertIn('ORDER BY "users_user"."id"', selects[0])
+
+    def test_apply_changes(self):
+        user = self.users[0]
+        objects = CartIngredient.objects
+        objects.apply_changes([user.id], {self.salt.id: 5})
+        objects.apply_changes([user.id], {self.salt.id: 3, self.sugar.id: 2})
+        self.assertEqual(
+            self.amounts(user), {self.salt.id: 8, self.sugar.id: 2}
+        )
+        objects.apply_changes([user.id], {self.salt.id: -8})
+        self.assertEqual(self.amounts(user), {self.sugar.id: 2})
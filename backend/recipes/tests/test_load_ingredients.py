@@ -0,0 +1,65 @@
+import io
+import json
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from recipes.management.commands.load_ingredients import JSONArrayReader
+from recipes.models import Ingredient
+
+
+class JSONArrayReaderTest(TestCase):
+    """Поэлементное чтение json-массива."""
+
+    def read(self, content, read_size=3):
+        return list(JSONArrayReader(io.StringIO(content), read_size))
+
+    def test_items_across_read_boundaries(self):
+        items = [
+            {'name': 'соль', 'measurement_unit': 'г'},
+            12345,
+            'строка, с запятой ] и скобкой',
+            [1, 2],
+        ]
+        self.assertEqual(self.read(json.dumps(items)), items)
+        self.assertEqual(self.read(json.dumps(items, indent=4), 1), items)
+
+    def test_empty_array(self):
+        self.assertEqual(self.read(' [ ] '), [])
+
+    def test_invalid(self):
+        for content in ('', '{}', '[1 2]', '[1,', '[{"a": 1}'):
+            with self.subTest(content=content):
+                with self.assertRaises(json.JSONDecodeError):
+                    self.read(content)
+
+
+class LoadIngredientsTest(TestCase):
+    """Загрузка ингредиентов из json."""
+
+    def load(self, items, **options):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.json', encoding='utf-8'
+        ) as f:
+            json.dump(items, f, ensure_ascii=False)
+            f.flush()
+            call_command('load_ingredients', f.name, stdout=io.StringIO(),
+                         **options)
+
+    def test_load_json(self):
+        self.load([
+            {'name': 'соль', 'measurement_unit': 'г'},
+            {'name': 'мука', 'measurement_unit': 'кг'},
+            'не ингредиент',
+        ], chunk_size=1)
+        self.assertEqual(
+            dict(Ingredient.objects.values_list('name', 'measurement_unit')),
+            {'соль': 'г', 'мука': 'кг'}
+        )
+
+    def test_chunk_size_must_be_positive(self):
+        for chunk_size in (0, -1):
+            with self.subTest(chunk_size=chunk_size):
+                with self.assertRaises(CommandError):
+                    self.load([], chunk_size=chunk_size)
@@ -1,10 +1,11 @@
 from django.contrib import admin
 
 from .models import Follow, User
+from recipes.admin_tools import AutocompleteFilter, LargeTableAdmin
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(LargeTableAdmin):
     """Управление пользователями через админ панель."""
     list_display = (
         'id',
@@ -15,11 +16,11 @@ class UserAdmin(admin.ModelAdmin):
         'last_name'
     )
     list_display_links = ('id', 'username')
-    search_fields = ('role', 'username')
+    search_fields = ('role', 'username', 'email')
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     """Управление подписками через админ панель."""
     list_display = (
         'id',
@@ -27,4 +28,10 @@ class FollowAdmin(admin.ModelAdmin):
         'author'
     )
     list_display_links = ('id', 'user')
-    search_fields = ('user',)
+    list_filter = (
+        ('user', AutocompleteFilter),
+        ('author', AutocompleteFilter)
+    )
+    list_select_related = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+    autocomplete_fields = ('user', 'author')
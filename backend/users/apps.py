@@ -5,3 +5,6 @@ class UsersConfig(AppConfig):
     """Настройки приложения Users."""
     name = 'users'
     verbose_name = 'Управление пользователями'
+
+    def ready(self):
+        import users.signals  # noqa: F401
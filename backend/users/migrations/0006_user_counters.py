@@ -0,0 +1,37 @@
+# Generated by Django 3.2.14 on 2026-10-18 12:00
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_followers_count(apps, schema_editor):
+    """Считает подписчиков существующих авторов."""
+    User = apps.get_model('users', 'User')
+    Follow = apps.get_model('users', 'Follow')
+    followers = Follow.objects.filter(
+        author=models.OuterRef('pk')
+    ).order_by().values('author').annotate(total=models.Count('pk'))
+    User.objects.update(followers_count=Coalesce(
+        models.Subquery(followers.values('total')), 0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_follow_author_user_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество рецептов'),
+        ),
+        migrations.RunPython(fill_followers_count, migrations.RunPython.noop),
+    ]
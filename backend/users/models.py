@@ -3,6 +3,38 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 
 
+def change_counter(queryset, field, delta):
+    """
+    Меняет счетчик на delta одним UPDATE с F-выражением.
+    Счетчик не уменьшается ниже нуля, расхождения исправляет
+    команда reconcile_counters.
+    """
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: models.F(field) + delta})
+
+
+class CountersMixin:
+    """
+    Модель со счетчиками counter_fields, которые меняет только
+    change_counter. Обычное сохранение существующего объекта
+    (смена пароля, админка, редактирование) не записывает счетчики,
+    чтобы не затереть устаревшим значением из памяти изменения,
+    сделанные другими запросами.
+    """
+    counter_fields = ()
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is None and not self._state.adding:
+            skipped = set(self.counter_fields) | self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped
+                and field.attname not in skipped
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+
 class UserRole:
     """Модель ролей пользователя."""
     USER = 'user'
@@ -13,7 +45,7 @@ class UserRole:
     ]
 
 
-class User(AbstractUser):
+class User(CountersMixin, AbstractUser):
     """Модель пользователей."""
     username = models.CharField(
         'Пользователь',
@@ -43,8 +75,19 @@ class User(AbstractUser):
         choices=UserRole.choices,
         default=UserRole.USER,
     )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False,
+    )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False,
+    )
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
+    counter_fields = ('followers_count', 'recipes_count')
 
     class Meta:
         ordering = ('id',)
@@ -54,6 +97,11 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    @property
+    def is_admin(self):
+        """Роль администратора, проверяется без запроса к базе."""
+        return self.role == UserRole.ADMIN
+
 
 class Follow(models.Model):
     """Модель подписок на авторов."""
@@ -79,6 +127,12 @@ class Follow(models.Model):
                 name='unique_subscription_user_author'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('author', 'user'),
+                name='follow_author_user_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user} подписан на {self.author}.'